@@ -0,0 +1,151 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from core.checkpoint import CHECKPOINT_EVERY, load_checkpoint
+from core.jobs import EvolutionJob
+from core.run_state import RunState
+from core.scheduler import JobScheduler
+from population import Population
+from sequence import Sequence, make_sequence
+from utils.global_constants import BENCHMARK_MAX_SCORES, BENCHMARK_SEQUENCES
+from utils.initialization import pivot_mix
+from utils.parallel import OffspringPool
+
+# Headless runs without Streamlit, e.g.
+#   python cli.py --benchmark 48 --generations 500 --population 500 --output run.json
+#   python cli.py --sequence HPHPPHHPHPPHPHHPPHPH --workers 4
+#   python cli.py --benchmark 100 --generations 5000 --checkpoint run.npz
+#   python cli.py --resume run.npz --generations 5000 (same sequence and settings, picks up exactly where it was)
+
+# Seconds between two progress lines
+PROGRESS_INTERVAL = 1.0
+
+
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(description="Fold an HP sequence with the genetic algorithm, no UI needed.")
+
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--benchmark", type=int, choices=sorted(BENCHMARK_SEQUENCES),
+                        help="Benchmark sequence length (stops at its known optimum)")
+    target.add_argument("--sequence", type=str, help="Custom HP sequence, e.g. HPHPPHHPH")
+    target.add_argument("--length", type=int, help="Random sequence of this length (see --seed)")
+
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the random sequence (with --length)")
+    parser.add_argument("--generations", type=int, default=100)
+    parser.add_argument("--population", type=int, default=200, help="Population size (even)")
+    parser.add_argument("--tourney", type=int, default=3, help="Tournament size")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the offspring (1 = none)")
+    parser.add_argument("--memetic-steps", type=int, default=0, help="Hill climbing steps on the offspring")
+    parser.add_argument("--memetic-top-k", type=int, default=None, help="Only hill climb the k best children")
+    parser.add_argument("--pivot-share", type=float, default=1.0,
+                        help="Share of the children mutated by a pivot move, the rest get local moves")
+    parser.add_argument("--patience", type=int, default=None, help="Stop after this many generations without a new best")
+    parser.add_argument("--no-bound-stop", action="store_true", help="Don't stop at the parity upper bound")
+    parser.add_argument("--rng-seed", type=int, default=None, help="Seed of the evolution itself (reproducible runs)")
+    parser.add_argument("--output", type=str, default=None, help="Write the results to this JSON file")
+    parser.add_argument("--quiet", action="store_true", help="No progress output")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Save the run to this .npz file as it goes")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY,
+                        help="Generations between two checkpoints")
+    parser.add_argument("--resume", type=str, default=None,
+                        help="Continue the run saved in this checkpoint (--generations more generations)")
+
+    args = parser.parse_args(argv)
+    if args.resume is None and args.benchmark is None and args.sequence is None and args.length is None:
+        parser.error("one of the arguments --benchmark --sequence --length --resume is required")
+    if args.resume is not None and (args.benchmark is not None or args.sequence is not None or args.length is not None):
+        parser.error("--resume continues the checkpoint's own sequence, don't choose another one")
+    if args.population % 2 == 1:
+        parser.error(f"Population size {args.population} must be an even integer.")
+    if not 0 <= args.pivot_share <= 1:
+        parser.error(f"Pivot share {args.pivot_share} must be between 0 and 1.")
+
+    return args
+
+def main(argv = None):
+    args = parse_args(argv)
+
+    if args.resume is not None:
+        # The checkpoint brings its own sequence, population, run state, random stream and settings
+        population, state, rng_state, metadata = load_checkpoint(args.resume)
+        target_seq, target, settings = metadata['sequence'], metadata['target'], metadata['settings']
+        sequence = population.sequence
+    else:
+        target = None
+        if args.benchmark is not None:
+            target_seq = BENCHMARK_SEQUENCES[args.benchmark]
+            target = BENCHMARK_MAX_SCORES[args.benchmark]
+        else:
+            target_seq = make_sequence(args.length, names=args.sequence, seed=args.seed)
+
+        # The run's own generator grows the population and the evolution continues its stream (see --rng-seed)
+        rng = np.random.default_rng(args.rng_seed)
+
+        sequence = Sequence(target_seq)
+        state = RunState()
+        population = Population(sequence, capacity=args.population)
+        population.grow(args.population, rng)
+        rng_state = rng.bit_generator.state
+
+        settings = {'tourney_size': args.tourney,
+                    'memetic_steps': args.memetic_steps,
+                    'memetic_top_k': args.memetic_top_k,
+                    'move_mix': pivot_mix(args.pivot_share),
+                    'target': target,
+                    'patience': args.patience,
+                    'stop_at_bound': not args.no_bound_stop}
+
+    run_settings = settings
+    checkpoint_path = args.checkpoint or args.resume
+    if checkpoint_path is not None:
+        run_settings = settings | {'checkpoint_path': checkpoint_path,
+                                   'checkpoint_every': args.checkpoint_every,
+                                   'metadata': {'sequence': target_seq, 'target': target, 'settings': settings}}
+
+    # Submitted to a local job scheduler like the page's bulk runs: without --workers the generations run in the
+    # scheduler's worker process, with them here (next to the offspring pool)
+    t0 = time.time()
+    pool = OffspringPool(args.workers, seed=args.rng_seed) if args.workers > 1 else None
+    try:
+        with JobScheduler(max_running=1, num_workers=1) as scheduler:
+            job = EvolutionJob(population, args.generations, state, settings=run_settings | {'pool': pool},
+                               scheduler=scheduler, rng_state=rng_state, processes=args.workers)
+
+            while not job.join(PROGRESS_INTERVAL):
+                if not args.quiet:
+                    _, snapshot = job.snapshot()
+                    print(f"Generation {snapshot['current_generation']}: best {snapshot['best_score_seen']}")
+    finally:
+        if pool is not None:
+            pool.close()
+    runtime = time.time() - t0
+
+    if job.error is not None:
+        raise job.error
+
+    state, reason = job.state, job.reason
+
+    print(f"Sequence {target_seq} (length {len(sequence)})")
+    print(f"Best score {state['best_score_seen']} at generation {state['best_score_gen']} "
+          f"({state['current_generation']} generations, {runtime:.2f}s"
+          + (f", stopped early: {reason})" if reason is not None else ")"))
+
+    if args.output is not None:
+        results = {'sequence': target_seq,
+                   'target': target,
+                   'upper_bound': sequence.upper_bound,
+                   'stop_reason': reason,
+                   'runtime': runtime,
+                   'settings': vars(args) | settings} | state.to_dict()
+
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    return state
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import json
+import os
+
+import numpy as np
+
+from core.run_state import RunState
+from population import Population
+from sequence import Sequence
+from utils.lattice import COORD_DTYPE, decode_genome
+
+# Bumped whenever the layout below changes
+CHECKPOINT_VERSION = 1
+
+# Generations between two checkpoints of a run, unless it says otherwise
+CHECKPOINT_EVERY = 50
+
+
+def save_checkpoint(path: str, population: Population, state: RunState, rng_state: dict = None,
+                    metadata: dict = None):
+    # Whole run in ONE uncompressed .npz: packed 2-bit genomes + first bead of every fold (exact coordinates in
+    # a fraction of the space), energies, ages, mega flags, the generator state, the run state and metadata
+    # (any JSON: run settings, page settings...). Written to a temporary file next to `path` first, then renamed
+    # over it, so a crash mid-write never leaves a broken checkpoint behind.
+    coords = population.coords
+    best_coords = state['best_score_coords']
+    best_gen = state['best_score_gen']
+
+    arrays = {'version': np.array(CHECKPOINT_VERSION),
+              'sequence': np.array(population.sequence.string),
+              'capacity': np.array(population.capacity),
+              'genomes': population.genomes(),
+              'origins': coords[:, 0, :].copy(),
+              'energies': population.energies,
+              'ages': population.ages,
+              'mega': population.mega,
+              'rng_state': np.array(json.dumps(rng_state)),
+              'metadata': np.array(json.dumps(metadata or {})),
+              'current_generation': np.array(state['current_generation']),
+              'energy_statistics': np.array(state['energy_statistics'], dtype=float).reshape(-1, 5),
+              'age_deaths': death_log_array(state['age_deaths']),
+              'fitness_deaths': death_log_array(state['fitness_deaths']),
+              'selection_differential': np.array(state['selection_differential'], dtype=float),
+              'best_score_seen': np.array(state['best_score_seen']),
+              'best_score_gen': np.array(-1 if best_gen is None else best_gen),
+              'best_score_iterations': np.array(state['best_score_iterations']),
+              'best_score_coords': np.zeros((0, 2), dtype=COORD_DTYPE) if best_coords is None else best_coords}
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+
+    with open(temp_path, "wb") as file:
+        np.savez(file, **arrays)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+def load_checkpoint(path: str):
+    # (population, run state, generator state or None, metadata) exactly as they were saved
+    with np.load(path, allow_pickle=False) as checkpoint:
+        if int(checkpoint['version']) != CHECKPOINT_VERSION:
+            raise ValueError(f"Error: Checkpoint {path} has version {int(checkpoint['version'])}, "
+                             f"expected {CHECKPOINT_VERSION}.")
+
+        sequence = Sequence(str(checkpoint['sequence']))
+        population = Population(sequence, int(checkpoint['capacity']))
+        population.append(decode_genome(checkpoint['genomes'], sequence.length, checkpoint['origins']),
+                          checkpoint['energies'])
+        population.ages[:] = checkpoint['ages']
+        population.mega[:] = checkpoint['mega']
+
+        state = RunState()
+        state.current_generation = int(checkpoint['current_generation'])
+        state.energy_statistics = checkpoint['energy_statistics'].tolist()
+        state.age_deaths = death_log_dict(checkpoint['age_deaths'])
+        state.fitness_deaths = death_log_dict(checkpoint['fitness_deaths'])
+        state.selection_differential = checkpoint['selection_differential'].tolist()
+        state.best_score_seen = int(checkpoint['best_score_seen'])
+        state.best_score_gen = None if int(checkpoint['best_score_gen']) < 0 else int(checkpoint['best_score_gen'])
+        state.best_score_iterations = int(checkpoint['best_score_iterations'])
+        state.best_score_coords = checkpoint['best_score_coords'] if len(checkpoint['best_score_coords']) else None
+
+        rng_state = json.loads(str(checkpoint['rng_state']))
+        metadata = json.loads(str(checkpoint['metadata']))
+
+    return population, state, rng_state, metadata
+
+def read_checkpoint_info(path: str):
+    # (generation, metadata) of a checkpoint without loading the population, None if there is no checkpoint
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path, allow_pickle=False) as checkpoint:
+        return int(checkpoint['current_generation']), json.loads(str(checkpoint['metadata']))
+
+def death_log_array(death_log: dict):
+    # {age: count} -> (2, k) array of ages and counts
+    return np.array([list(death_log.keys()), list(death_log.values())], dtype=np.int64).reshape(2, -1)
+
+def death_log_dict(death_log: np.ndarray):
+    return {int(age): int(count) for age, count in zip(*death_log)}
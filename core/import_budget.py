@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+# Seconds a fresh interpreter may take to import each engine module (NumPy alone is most of it).
+# Worker processes import these on every start, so they must stay free of the UI dependencies below.
+IMPORT_BUDGETS = {"utils.physics": 0.25,
+                  "utils.parallel": 0.4,
+                  "core.runner": 0.4}
+HEAVY_MODULES = ("streamlit", "plotly", "pandas", "scipy", "gspread", "streamlit_gsheets")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module: str, repeats: int = 3):
+    # (best import time in seconds over `repeats` fresh interpreters, heavy modules the import loaded)
+    code = ("import sys, time\n"
+            "start = time.perf_counter()\n"
+            f"import {module}\n"
+            "print(time.perf_counter() - start)\n"
+            f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))")
+
+    best, loaded = None, []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True,
+                                check=True)
+        seconds, heavy = result.stdout.splitlines()
+        best = float(seconds) if best is None else min(best, float(seconds))
+        loaded = heavy.split(",") if heavy else []
+
+    return best, loaded
+
+def check_import_budgets(budgets: dict = None):
+    # Error messages for every module over its budget or loading a heavy module (empty = all fine)
+    errors = []
+    for module, budget in (budgets or IMPORT_BUDGETS).items():
+        seconds, loaded = measure_import(module)
+        print(f"{module}: {seconds * 1000:.0f} ms (budget {budget * 1000:.0f} ms)")
+
+        if seconds > budget:
+            errors.append(f"Error: Importing {module} took {seconds:.3f}s, over its {budget:.3f}s budget.")
+        if loaded:
+            errors.append(f"Error: Importing {module} loads {', '.join(loaded)}.")
+
+    return errors
+
+
+if __name__ == "__main__":
+    # python -m core.import_budget (exits with 1 if any budget is broken)
+    errors = check_import_budgets()
+    for error in errors:
+        print(error)
+
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,162 @@
+import copy
+import threading
+import time
+
+import numpy as np
+
+from core.checkpoint import CHECKPOINT_EVERY, save_checkpoint
+from core.run_state import RunState
+from core.runner import run_chunk
+from core.scheduler import JobScheduler
+from population import Population
+from utils.stats_helpers import get_energy_statistics
+
+# Stop reason of a job the user cancelled (next to the reasons of utils.genetics.stop_reason)
+CANCELLED = "cancelled"
+
+# Generations per turn on the scheduler (also how often a snapshot can change)
+CHUNK_GENERATIONS = 10
+
+
+class EvolutionJob:
+    # Bulk evolution in a background thread, so the page script (and the server) is never blocked by it.
+    # The job owns `population` and `state` until it is done: the page only reads them through snapshot().
+    # It runs in chunks of CHUNK_GENERATIONS, each one after taking a turn on the scheduler (if any):
+    # - settings given: GA run by core.runner.run_chunk (settings are run_generations' keyword arguments), in the
+    #   scheduler's process pool, or here if there is no scheduler or the settings hold an OffspringPool
+    # - else the engines stay in this process (their worker processes, pipes and shared memory can't move) and
+    #   the chunk runs here, one generation at a time:
+    #   step(population, state) -> population: one generation (GA, islands or a replica exchange round)
+    #   record(population, state): records the best fold
+    #   stop(state) -> reason or None: early stop check after every generation
+    # GA chunks draw from the job's own generator `rng`, never from the shared one other jobs and sessions use.
+    # It continues rng_state (e.g. from a checkpoint) if given, else it is a fresh stream.
+    # processes: how many processes a chunk keeps busy (the engines' workers), i.e. the scheduler slots it takes.
+    def __init__(self, population: Population, num_generations: int, state: RunState, step = None, record = None,
+                 stop = None, settings: dict = None, scheduler: JobScheduler = None, session: str = None,
+                 rng_state: dict = None, processes: int = 1):
+        self.population = population
+        self.state = state
+        self.num_generations = num_generations
+        self.step = step
+        self.record = record
+        self.stop = stop
+        self.settings = settings
+        self.scheduler = scheduler
+        self.session = session
+        self.processes = processes
+        self.rng = np.random.default_rng()
+        if rng_state is not None:
+            self.rng.bit_generator.state = rng_state
+
+        self.generations_done = 0
+        self.reason = None
+        self.error = None
+        self.start_time = time.time()
+        self.end_time = None
+
+        self.lock = threading.Lock()
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            while self.reason is None and self.generations_done < self.num_generations:
+                num_generations = min(CHUNK_GENERATIONS, self.num_generations - self.generations_done)
+
+                if self.cancel_event.is_set() or not self.take_turn():
+                    self.reason = CANCELLED
+                    break
+
+                try:
+                    if self.settings is not None:
+                        self.run_settings(num_generations)
+                    else:
+                        self.run_local(num_generations)
+                finally:
+                    if self.scheduler is not None:
+                        self.scheduler.release(self)
+
+            self.save_last_checkpoint()
+        except Exception as error: # handed to the page, a thread has nowhere else to report it
+            self.error = error
+        finally:
+            self.end_time = time.time()
+
+    def take_turn(self):
+        return self.scheduler is None or self.scheduler.acquire(self, self.session, self.processes)
+
+    def run_settings(self, num_generations: int):
+        generation = self.state['current_generation']
+
+        if self.scheduler is not None and self.settings.get('pool') is None:
+            future = self.scheduler.submit(run_chunk, self.population, self.state, num_generations, self.rng,
+                                           **self.settings)
+            population, state, reason, rng = future.result()
+        else: # on copies, so snapshot() never waits for a whole chunk: the lock is only taken to swap them in
+            population, state, rng = self.population.copy(), RunState.from_state(self.state), copy.deepcopy(self.rng)
+            population, state, reason, rng = run_chunk(population, state, num_generations, rng, **self.settings)
+
+        with self.lock:
+            self.population, self.state, self.rng = population, state, rng
+            self.generations_done += state['current_generation'] - generation
+            self.reason = reason
+
+    def save_last_checkpoint(self):
+        # Checkpointed GA runs are saved every checkpoint_every generations and when they stop early (by
+        # run_generations). The end of the whole job (all generations done, or cancelled) is saved here, once,
+        # if it fell between two of those.
+        if self.settings is None or self.settings.get('checkpoint_path') is None or self.generations_done == 0:
+            return
+        if self.reason not in (None, CANCELLED):
+            return
+        if self.state['current_generation'] % self.settings.get('checkpoint_every', CHECKPOINT_EVERY) == 0:
+            return
+
+        save_checkpoint(self.settings['checkpoint_path'], self.population, self.state, self.rng.bit_generator.state,
+                        self.settings.get('metadata'))
+
+    def run_local(self, num_generations: int):
+        for _ in range(num_generations):
+            if self.cancel_event.is_set():
+                return
+
+            with self.lock:
+                self.population = self.step(self.population, self.state)
+                self.state['current_generation'] += 1
+                self.state['energy_statistics'].append(get_energy_statistics(self.population))
+                self.record(self.population, self.state)
+                self.generations_done += 1
+
+                self.reason = self.stop(self.state) if self.stop is not None else None
+
+            if self.reason is not None:
+                return
+
+    def snapshot(self):
+        # (copy of the population, copy of the state) as of the last finished generation (or chunk)
+        with self.lock:
+            return self.population.copy(), RunState.from_state(self.state)
+
+    def position(self):
+        # Place in the scheduler's line (0 = running)
+        return 0 if self.scheduler is None else self.scheduler.position(self)
+
+    def progress(self):
+        return self.generations_done / max(self.num_generations, 1)
+
+    def runtime(self):
+        return (self.end_time or time.time()) - self.start_time
+
+    def done(self):
+        return not self.thread.is_alive()
+
+    def cancel(self):
+        # Stops after the generation (or chunk) in progress
+        self.cancel_event.set()
+
+    def join(self, timeout: float = None):
+        self.thread.join(timeout)
+
+        return self.done()
@@ -0,0 +1,106 @@
+import copy
+
+import numpy as np
+
+from utils.initialization import MoveStats
+
+
+class RunState:
+    # Everything a run records besides the population itself: generation count, energy statistics, death logs,
+    # selection differential, move statistics and the best fold so far. It uses the same keys as the Streamlit session state and,
+    # like st.session_state, reads as state['key'] or state.key, so the helpers below take either one.
+    KEYS = ('current_generation', 'energy_statistics', 'age_deaths', 'fitness_deaths', 'selection_differential',
+            'move_stats', 'best_score_seen', 'best_score_gen', 'best_score_coords', 'best_score_iterations')
+
+    def __init__(self):
+        self.current_generation = 0
+        self.energy_statistics = []
+        self.age_deaths = {}
+        self.fitness_deaths = {}
+        self.selection_differential = []
+        self.move_stats = MoveStats() # the children's mutations per move type
+
+        # Best fold so far (for records and the leaderboard)
+        self.best_score_seen = 0
+        self.best_score_gen = None
+        self.best_score_coords = None
+        self.best_score_iterations = 0
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        setattr(self, key, value)
+
+    def get(self, key: str, default = None):
+        return getattr(self, key, default)
+
+    @classmethod
+    def from_state(cls, state):
+        # Independent copy of any state with these keys (st.session_state, another RunState), missing keys = defaults
+        run_state = cls()
+        for key in cls.KEYS:
+            run_state[key] = copy.deepcopy(state.get(key, run_state[key]))
+
+        return run_state
+
+    def copy_into(self, state):
+        # Write everything recorded here into another state (e.g. back into st.session_state)
+        for key in self.KEYS:
+            state[key] = copy.deepcopy(self[key])
+
+    def to_dict(self):
+        # Plain Python values only (for JSON)
+        coords = self.best_score_coords
+
+        return {'current_generation': self.current_generation,
+                'energy_statistics': [[float(value) for value in stats] for stats in self.energy_statistics],
+                'age_deaths': {int(age): int(count) for age, count in self.age_deaths.items()},
+                'fitness_deaths': {int(age): int(count) for age, count in self.fitness_deaths.items()},
+                'selection_differential': [float(value) for value in self.selection_differential],
+                'move_stats': {'tried': self.move_stats.tried, 'valid': self.move_stats.valid,
+                               'accepted': self.move_stats.accepted},
+                'best_score_seen': int(self.best_score_seen),
+                'best_score_gen': self.best_score_gen,
+                'best_score_iterations': int(self.best_score_iterations),
+                'best_score_coords': None if coords is None else coords.astype(int).tolist()}
+
+# Logging helpers. state is a RunState, st.session_state or a dict with the same keys; None = don't record.
+def update_death_log(ages: np.ndarray, session_state: str, state = None):
+    if state is None:
+        return
+
+    death_log = state.get(session_state, None)
+
+    if death_log is None:
+        raise ValueError(f"ERROR: Session state {session_state} does not exist for updating death log...")
+
+    for poly_age, count in zip(*np.unique(ages, return_counts=True)):
+        poly_age = int(poly_age)
+        death_log[poly_age] = death_log.get(poly_age, 0) + int(count)
+
+def merge_death_log(deaths: dict, session_state: str, state = None):
+    # Add a death log collected elsewhere (an island) into this one
+    if state is None:
+        return
+
+    death_log = state.get(session_state, None)
+
+    if death_log is None:
+        raise ValueError(f"ERROR: Session state {session_state} does not exist for updating death log...")
+
+    for poly_age, count in deaths.items():
+        death_log[poly_age] = death_log.get(poly_age, 0) + count
+
+def update_selection_differential(selection_differential: float, state = None):
+    if state is None:
+        return
+
+    state["selection_differential"].append(selection_differential)
+
+def merge_move_stats(move_stats: MoveStats, state = None):
+    # Add a generation's (or an island's) move statistics into the run's, if it keeps any
+    if state is None or state.get('move_stats', None) is None:
+        return
+
+    state['move_stats'].merge(move_stats)
@@ -0,0 +1,72 @@
+import numpy as np
+
+from core.checkpoint import CHECKPOINT_EVERY, save_checkpoint
+from core.run_state import RunState
+from population import Population
+from utils.genetics import increase_generation, stop_reason
+from utils.initialization import get_rng
+from utils.parallel import OffspringPool
+from utils.stats_helpers import get_energy_statistics
+
+
+def record_best(population: Population, state: RunState):
+    # Iterations = energy evaluations until the record (generation x population size)
+    best_idx = np.argmax(population.energies)
+    current_max = int(population.energies[best_idx])
+
+    if current_max > state['best_score_seen']:
+        state['best_score_seen'] = current_max
+        state['best_score_gen'] = state['current_generation']
+        state['best_score_coords'] = population.coords[best_idx].copy()
+        state['best_score_iterations'] = state['current_generation'] * len(population)
+
+def check_stop(state: RunState, target: int = None, upper_bound: int = None, patience: int = None):
+    # stop_reason for the run recorded in `state` (its staleness counts from the generation of the best score)
+    stale_generations = state['current_generation'] - (state['best_score_gen'] or 0)
+
+    return stop_reason(state['best_score_seen'], target=target, upper_bound=upper_bound,
+                       stale_generations=stale_generations, patience=patience)
+
+def run_generations(population: Population, num_generations: int, state: RunState, tourney_size: int = 3,
+                    pool: OffspringPool = None, memetic_steps: int = 0, memetic_top_k: int = None,
+                    target: int = None, patience: int = None, stop_at_bound: bool = True,
+                    checkpoint_path: str = None, checkpoint_every: int = CHECKPOINT_EVERY, metadata: dict = None,
+                    move_mix: dict = None, rng: np.random.Generator = None):
+    # Headless bulk evolution: the same generation loop as the Simulation page, with everything it records
+    # going to `state`. With a checkpoint_path, the run is saved there every checkpoint_every generations and
+    # when it stops early (see core/checkpoint.py, metadata goes into the checkpoint as is). Runs split into
+    # chunks (core/jobs.py) save their very end themselves, so a chunk ending off the cadence writes nothing.
+    # rng: the run's own generator (default the shared one), its state goes into the checkpoints.
+    # Returns (population, stop reason or None if all num_generations ran).
+    if not state['energy_statistics']:
+        state['energy_statistics'].append(get_energy_statistics(population))
+        record_best(population, state)
+
+    upper_bound = population.sequence.upper_bound if stop_at_bound else None
+    rng = get_rng(rng)
+
+    for _ in range(num_generations):
+        population = increase_generation(population, tourney_size, pool, state=state,
+                                         memetic_steps=memetic_steps, memetic_top_k=memetic_top_k, move_mix=move_mix,
+                                         rng=rng)
+        state['current_generation'] += 1
+        state['energy_statistics'].append(get_energy_statistics(population))
+        record_best(population, state)
+
+        reason = check_stop(state, target=target, upper_bound=upper_bound, patience=patience)
+
+        if checkpoint_path is not None and (reason is not None or state['current_generation'] % checkpoint_every == 0):
+            save_checkpoint(checkpoint_path, population, state, rng.bit_generator.state, metadata)
+        if reason is not None:
+            return population, reason
+
+    return population, None
+
+def run_chunk(population: Population, state: RunState, num_generations: int, rng: np.random.Generator,
+              **settings):
+    # run_generations in a worker process (see core/scheduler.py): the state comes back with the population.
+    # The job's own generator travels with it (pickled with its exact state), so its chunks can run on any worker
+    # without touching that worker's shared generator, and a checkpoint holds the exact stream position.
+    population, reason = run_generations(population, num_generations, state, rng=rng, **settings)
+
+    return population, state, reason, rng
@@ -0,0 +1,102 @@
+import os
+import threading
+from collections import deque
+
+from utils.parallel import make_worker_pool
+
+# How long a waiting job sleeps before it looks at its cancel flag again (seconds)
+WAIT_INTERVAL = 0.5
+
+
+class JobScheduler:
+    # Local job scheduler shared by every bulk run of this machine's server process (and by CLI runs):
+    # - at most max_running slots are taken at once, the other jobs wait in line. A job running a chunk of
+    #   generations takes one slot per process the chunk keeps busy: 1 for a chunk in the scheduler's own pool (or
+    #   in this process), its engine's worker / island processes otherwise (at most max_running), so runs with
+    #   engines count against the same cap as the others. Engines sit idle between their job's chunks.
+    # - fairness between sessions: slots go round robin over the sessions with waiting jobs, and a job gives its
+    #   slot back after every chunk, so a long run can't keep other sessions waiting until it is done
+    # - a bounded process pool (num_workers) for the chunks that can run in a worker process
+    # No broker: the queue is a deque per session behind one lock.
+    def __init__(self, max_running: int = None, num_workers: int = None, seed: int = None):
+        self.max_running = max_running or os.cpu_count() or 1
+        self.num_workers = num_workers or self.max_running
+
+        self.executor = make_worker_pool(self.num_workers, seed)
+
+        self.condition = threading.Condition()
+        self.waiting = {} # session -> deque of waiting jobs
+        self.turns = deque() # sessions with waiting jobs, next in line first
+        self.running = {} # job -> slots it holds
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def acquire(self, job, session: str, slots: int = 1):
+        # Blocks until the job may run a chunk on `slots` slots. Returns False if the job was cancelled while it waited.
+        slots = min(max(slots, 1), self.max_running)
+        with self.condition:
+            if session not in self.waiting:
+                self.waiting[session] = deque()
+                self.turns.append(session)
+            self.waiting[session].append(job)
+
+            while not (self.slots_taken() + slots <= self.max_running and self.next_job() is job):
+                if job.cancel_event.is_set():
+                    self.remove(job, session, to_back=False)
+                    self.condition.notify_all()
+                    return False
+                self.condition.wait(WAIT_INTERVAL)
+
+            # This session had its turn, it goes to the back of the line
+            self.remove(job, session, to_back=True)
+            self.running[job] = slots
+
+            return True
+
+    def release(self, job):
+        with self.condition:
+            self.running.pop(job, None)
+            self.condition.notify_all()
+
+    def slots_taken(self):
+        return sum(self.running.values())
+
+    def next_job(self):
+        return self.waiting[self.turns[0]][0] if self.turns else None
+
+    def remove(self, job, session: str, to_back: bool):
+        queue = self.waiting[session]
+        queue.remove(job)
+
+        if not queue:
+            del self.waiting[session]
+            self.turns.remove(session)
+        elif to_back:
+            self.turns.remove(session)
+            self.turns.append(session)
+
+    def position(self, job):
+        # 0 = running (or between two chunks), k = k-th in line
+        with self.condition:
+            queues = [list(self.waiting[session]) for session in self.turns]
+
+        line = []
+        for k in range(max(map(len, queues), default=0)):
+            line += [queue[k] for queue in queues if k < len(queue)]
+
+        return line.index(job) + 1 if job in line else 0
+
+    def num_waiting(self):
+        with self.condition:
+            return sum(len(queue) for queue in self.waiting.values())
+
+    def submit(self, fn, *args, **kwargs):
+        # Runs fn in the scheduler's process pool
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def close(self):
+        self.executor.shutdown()
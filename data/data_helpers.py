@@ -1,12 +1,8 @@
 from datetime import datetime
 
 import numpy as np
-import pandas as pd
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
 import json
-import gspread
-from google.oauth2.service_account import Credentials
 
 from utils.name_generator import generate_random_name
 
@@ -15,6 +11,11 @@ SHEET_NAME = "Sheet1"
 
 @st.cache_resource
 def get_gspread_client():
+    # Sheets dependencies are imported here, not at module level: they take seconds to import
+    # and only the leaderboard (and saving a score) needs them
+    import gspread
+    from google.oauth2.service_account import Credentials
+
     if "connections" not in st.secrets or "gsheets" not in st.secrets.connections:
         st.error("❌ Secrets not found. Check .streamlit/secrets.toml")
         st.stop()
@@ -29,13 +30,16 @@ def get_gspread_client():
 
 
 def save_score(seq: int, player_name: str, score: int, iterations: int, coords: np.ndarray):
+    import pandas as pd
+    from streamlit_gsheets import GSheetsConnection
+
     conn = st.connection("gsheets", type=GSheetsConnection)
 
     # Get date
     date = datetime.now().strftime("%m/%d/%Y")
 
-    # Convert coords to list, then json string
-    coords_list = coords.tolist()
+    # Convert coords to list, then json string (as floats, so stored rows keep the same format)
+    coords_list = coords.astype(float).tolist()
     coords_json = json.dumps(coords_list)
 
     # Row to add
@@ -65,6 +69,8 @@ def save_score(seq: int, player_name: str, score: int, iterations: int, coords:
 
 @st.cache_data(ttl=60) # Keep data for at least 60 seconds before fetching new data
 def load_data():
+    import pandas as pd
+
     client = get_gspread_client()
     try:
         # Open the sheet
@@ -32,7 +32,7 @@ def main():
     history_length = len(st.session_state['lab_history'])
 
     if history_length > 0:
-        cur_poly_coords = st.session_state['lab_history'][-1]
+        cur_poly_coords = history_coords(-1)
         prev_poly_coords = None
     else:
         cur_poly_coords = None
@@ -71,10 +71,10 @@ def main():
         b1, button_col, b2 = st.columns([2, 1, 2])
 
         if history_length > 0:
-            cur_poly_coords = st.session_state['lab_history'][poly_index]
+            cur_poly_coords = history_coords(poly_index)
 
             if poly_index > 0:
-                prev_poly_coords = st.session_state['lab_history'][poly_index - 1]
+                prev_poly_coords = history_coords(poly_index - 1)
             else:
                 prev_poly_coords = None
 
@@ -84,7 +84,8 @@ def main():
                              names=st.session_state['lab_sequence'])
 
         if button_col.button("Mutate", width='stretch'):
-            st.session_state['lab_history'].append(one_ms_mutate(polymer.coords).copy())
+            one_ms_mutate(polymer.coords)
+            st.session_state['lab_history'].append((polymer.coords[0].copy(), polymer.genome))
             st.rerun()
 
     with desc_col:
@@ -96,6 +97,12 @@ def main():
                 st.session_state['lab_prev_score'] = calculate_energy_vectorized(prev_poly_coords, st.session_state['lab_sequence'])
                 st.write(f"Previous Score: {st.session_state['lab_prev_score']}")
 
+def history_coords(index: int):
+    # Decode one (first bead, genome) history snapshot back to coordinates
+    origin, genome = st.session_state['lab_history'][index]
+
+    return Polymer.from_genome(st.session_state['lab_polymer'].sequence, genome, origin).coords
+
 def plot_overlay(cur_coords: np.ndarray, prev_coords: np.ndarray, names: np.ndarray, container: DeltaGenerator = st):
     cur_fig = visualize_chain_plotly(cur_coords, names)
 
@@ -1,20 +1,45 @@
 import numpy as np
+import os
+import re
 import streamlit as st
-import time
+import uuid
 
+from functools import partial
 from streamlit.delta_generator import DeltaGenerator
 
-from polymer import Polymer
-from simulation import start_sim
+from core.checkpoint import CHECKPOINT_EVERY, load_checkpoint, read_checkpoint_info
+from core.jobs import EvolutionJob
+from core.runner import check_stop, record_best
+from core.run_state import RunState
+from population import Population
+from simulation import (checkpoint_path, get_scheduler, make_sequence, start_exact_solver, start_islands, start_remc,
+                        start_sim)
+from utils.enumeration import EXACT_MAX_LENGTH
 from utils.genetics import increase_generation
 from utils.global_constants import BENCHMARK_SELECTION, BENCHMARK_MAX_SCORES
+from utils.initialization import MoveStats, pivot_mix
 from utils.name_generator import generate_random_name
+from utils.parallel import OffspringPool
 from utils.plotting import plot_cur_best, plot_cur_worst, plot_deaths, plot_energies, plot_pop_scores
+from utils.session_state_helpers import SessionResources
 from utils.st_helpers import (centered_subheader, centered_title,
                               fix_dropdown_cursor, centered_caption, centered_text)
 from utils.stats_helpers import get_energy_statistics
 from data.data_helpers import save_score
 
+# Why a bulk run stopped early (stop reasons of utils.genetics.stop_reason, and cancelled jobs)
+STOP_MESSAGES = {"target": "optimal score reached",
+                 "bound": "upper bound reached",
+                 "patience": "no improvement",
+                 "cancelled": "cancelled"}
+
+# Seconds between two looks at a running bulk job
+BULK_POLL_INTERVAL = 1.0
+
+# Session settings a checkpoint keeps (to resume the run with the same settings)
+CHECKPOINT_SETTINGS = ('population_size', 'tourney_size', 'length', 'sequence', 'seed', 'num_workers',
+                       'memetic_steps', 'memetic_top_k', 'mutation_pivot_share', 'bm_max')
+
 st.set_page_config(
     page_title="Simulation - Protein Folding Simulator",
     layout="wide")
@@ -33,6 +58,34 @@ if 'sim_initialized' not in st.session_state:
     st.session_state['sim_initialized'] = False
 if 'bm_max' not in st.session_state:
     st.session_state['bm_max'] = "N/A"
+if 'offspring_pool' not in st.session_state:
+    st.session_state['offspring_pool'] = None
+if 'archipelago' not in st.session_state:
+    st.session_state['archipelago'] = None
+if 'remc' not in st.session_state:
+    st.session_state['remc'] = None
+if 'exact_solver' not in st.session_state:
+    st.session_state['exact_solver'] = None
+if 'exact_cancel' not in st.session_state:
+    st.session_state['exact_cancel'] = None
+if 'exact_max' not in st.session_state:
+    st.session_state['exact_max'] = None
+if 'exact_found' not in st.session_state:
+    st.session_state['exact_found'] = None
+if 'bulk_job' not in st.session_state:
+    st.session_state['bulk_job'] = None
+if 'session_id' not in st.session_state:
+    # This session's place in the job scheduler's line and the name of its checkpoint. It is kept in the URL,
+    # so after a refresh (or a server restart) the same run id finds its checkpoint again.
+    run_id = st.query_params.get('run', '')
+    st.session_state['session_id'] = run_id if re.fullmatch(r"[0-9a-f]{32}", run_id) else uuid.uuid4().hex
+    st.query_params['run'] = st.session_state['session_id']
+if 'rng_state' not in st.session_state:
+    st.session_state['rng_state'] = None
+if 'mutation_pivot_share' not in st.session_state:
+    st.session_state['mutation_pivot_share'] = 1.0
+if 'session_resources' not in st.session_state:
+    st.session_state['session_resources'] = SessionResources()
 
 
 
@@ -66,10 +119,40 @@ def main():
                     st.caption("(Default settings A-okay)")
                     st.caption("Caution: Simulation time scales proportionally to population size")
 
+                    optimizer = st.radio("Optimizer", ["Genetic Algorithm", "Replica Exchange"], horizontal=True,
+                                         help="Evolve a population, or run Monte Carlo replicas at a ladder of temperatures")
+
                     pop_size = st.slider("Population Size", min_value=100, max_value=1000, value=200, step=2,
                                          help="How big the population will be")
                     tourney_size = st.slider("Tournament Size", min_value=2, max_value=25, value=3, step=1,
                                              help="How big the tournament groups in selection will be")
+                    memetic_steps = st.slider("Memetic Steps", min_value=0, max_value=50, value=0, step=1,
+                                              help="Greedy local search steps on every child after mutation (0 = off)")
+                    memetic_top_k = st.slider("Memetic Children", min_value=0, max_value=500, value=0, step=10,
+                                              help="Only hill climb this many of the best children (0 = all children)")
+                    mutation_pivot_share = st.slider("Mutation Pivot Moves", min_value=0.0, max_value=1.0, value=1.0,
+                                                     step=0.05,
+                                                     help="Share of the children mutated by a pivot move, the rest get local moves (end, corner, crankshaft, pull)")
+                    num_workers = st.number_input("Worker Processes", min_value=1, max_value=os.cpu_count() or 1,
+                                                  value=1, step=1,
+                                                  help="CPU cores used to mutate the children (1 = no worker processes)")
+
+                    num_islands = st.slider("Islands", min_value=1, max_value=10, value=1, step=1,
+                                            help="Sub-populations evolved side by side, each by its own process (1 = one population)")
+                    migration_interval = st.slider("Migration Interval", min_value=1, max_value=50, value=10, step=1,
+                                                   help="Generations between migrations from each island to the next")
+                    num_migrants = st.slider("Migrants", min_value=1, max_value=4, value=2, step=1,
+                                             help="How many of an island's best polymers migrate each time")
+
+                    st.caption("Replica Exchange")
+                    num_replicas = st.slider("Replicas", min_value=2, max_value=32, value=8, step=1,
+                                             help="One Monte Carlo replica per temperature")
+                    t_min, t_max = st.slider("Temperature Range", min_value=0.1, max_value=3.0, value=(0.3, 1.2),
+                                             step=0.05, help="Coldest and hottest temperature of the ladder")
+                    steps_per_exchange = st.slider("Steps per Exchange", min_value=10, max_value=1000, value=100,
+                                                   step=10, help="Monte Carlo steps of each replica between swaps")
+                    pivot_share = st.slider("Pivot Moves", min_value=0.0, max_value=1.0, value=0.5, step=0.05,
+                                            help="Share of pivot moves, the rest are local moves (end, corner, crankshaft, pull)")
 
                     st.caption("")
 
@@ -83,9 +166,18 @@ def main():
 
                     load_bar_ph = st.empty()
 
+        # A saved GA run of this run id (after a refresh or a restart) can be picked up where it stopped
+        checkpoint_info = None if st.session_state['sim_initialized'] else read_checkpoint_info(
+            checkpoint_path(st.session_state['session_id']))
+        if checkpoint_info is not None:
+            if st.button(f"Resume Saved Run (Generation {checkpoint_info[0]})", width='stretch'):
+                resume_run()
+                st.rerun()
+
 
 
     if sim_started:
+        cancel_bulk_job()
         reset_session_states()
 
         # Initialize sim settings
@@ -94,6 +186,15 @@ def main():
         st.session_state['length'] = length
         st.session_state['sequence'] = sequence
         st.session_state['seed'] = seed
+        st.session_state['num_workers'] = num_workers
+        st.session_state['num_islands'] = num_islands
+        st.session_state['memetic_steps'] = memetic_steps
+        st.session_state['memetic_top_k'] = memetic_top_k or None
+        st.session_state['mutation_pivot_share'] = mutation_pivot_share
+
+        # Islands already use one process each, so they don't get an offspring pool as well
+        set_offspring_pool(num_workers if num_islands == 1 and optimizer == "Genetic Algorithm" else 1)
+        close_engines()
 
         # Only update 'bm_max' after sim has started, not during sim (stops bypass after generation)
         if mode == "Custom":
@@ -101,30 +202,61 @@ def main():
         else:
             st.session_state['bm_max'] = BENCHMARK_MAX_SCORES[length]
 
+        # Custom sequences have no known optimum: solve short ones exactly in the background meanwhile
+        start_exact_search(mode, length, seed)
+
         # Create parent population
         # Note that, if custom, sequence = None (and if benchmark, seed = None)
-        new_population, sequence_names = start_sim(pop_size=st.session_state['population_size'],
-                                                   length=st.session_state['length'],
-                                                   seed=st.session_state['seed'],
-                                                   names=st.session_state['sequence'],
-                                                   container=load_bar_ph)
+        if optimizer == "Replica Exchange":
+            remc, sequence_names = start_remc(length=st.session_state['length'],
+                                              num_replicas=num_replicas,
+                                              t_min=t_min,
+                                              t_max=t_max,
+                                              steps_per_exchange=steps_per_exchange,
+                                              pivot_share=pivot_share,
+                                              num_workers=num_workers,
+                                              seed=st.session_state['seed'],
+                                              names=st.session_state['sequence'])
+            keep_resource('remc', remc)
+            st.session_state['population_size'] = num_replicas
+            new_population = remc.population
+        elif num_islands == 1:
+            new_population, sequence_names = start_sim(pop_size=st.session_state['population_size'],
+                                                       length=st.session_state['length'],
+                                                       seed=st.session_state['seed'],
+                                                       names=st.session_state['sequence'],
+                                                       container=load_bar_ph)
+        else:
+            archipelago, sequence_names = start_islands(pop_size=st.session_state['population_size'],
+                                                        length=st.session_state['length'],
+                                                        num_islands=num_islands,
+                                                        tourney_size=st.session_state['tourney_size'],
+                                                        migration_interval=migration_interval,
+                                                        num_migrants=num_migrants,
+                                                        seed=st.session_state['seed'],
+                                                        names=st.session_state['sequence'],
+                                                        memetic_steps=st.session_state['memetic_steps'],
+                                                        memetic_top_k=st.session_state['memetic_top_k'],
+                                                        state=st.session_state,
+                                                        move_mix=pivot_mix(mutation_pivot_share))
+            keep_resource('archipelago', archipelago)
+            new_population = archipelago.population
 
         # Initialize population states
         st.session_state['population'] = new_population
         st.session_state['sequence'] = sequence_names
-        st.session_state['population_scores'] = [p.energy for p in st.session_state['population']]
+        st.session_state['population_scores'] = st.session_state['population'].energies.tolist()
 
         # Initialize energy states
         current_energy_stats = get_energy_statistics(st.session_state['population'])
         st.session_state['energy_statistics'] = [current_energy_stats]
 
-        # Required to initialize these class attributes
-        Polymer.encode_sequence(st.session_state['length'], st.session_state['sequence'])
-
         st.session_state['sim_initialized'] = True
 
 
     if st.session_state['sim_initialized']:
+        check_exact_search()
+        sync_bulk_job()
 
         with poly_col:
             with st.container(border=True):
@@ -175,11 +307,11 @@ def main():
         centered_caption(text=f"Scores for Generation {st.session_state['current_generation']}",
                          container=score_hist_caption_ph)
 
-        # SINGLE GENERATION
-        if pseudo_sidebar.button("Single-Generation Evolution"):
+        # SINGLE GENERATION (not while a bulk run owns the population)
+        if pseudo_sidebar.button("Single-Generation Evolution", disabled=st.session_state['bulk_job'] is not None):
             # Update population
-            st.session_state['population'] = increase_generation(st.session_state['population'],
-                                                                 st.session_state['tourney_size'])
+            st.session_state['population'] = evolve_population(st.session_state['population'], st.session_state,
+                                                               **engine_settings())
             # Update current generation num
             st.session_state['current_generation'] += 1
 
@@ -188,56 +320,35 @@ def main():
             st.session_state['energy_statistics'].append(current_energy_stats)
 
             # Update scores
-            st.session_state['population_scores'] = [p.energy for p in st.session_state['population']]
+            st.session_state['population_scores'] = st.session_state['population'].energies.tolist()
 
             # Check for records
-            check_for_records(st.session_state['population'], st.session_state['current_generation'])
+            check_for_records(st.session_state['population'], st.session_state, st.session_state['remc'])
 
             # Update page
             st.rerun()
 
 
-        # BULK GENERATION
-        with pseudo_sidebar.form(f"Bulk Generation"):
-            num_generations = st.slider("Number of Generations",
-                                        min_value=50, max_value=1000,
-                                        value=100, step=10, width='stretch')
-            gen_start = st.form_submit_button("Multi-Generation Evolution")
-
-        if gen_start:
-            progress_bar = pseudo_sidebar.progress(0)
-            t0 = time.time()
-            # Do n generations
-            for i in range(num_generations):
-                # Every 5 generations, update progress bar
-                if i % 5 == 0:
-                    perc = i / num_generations
-                    progress_bar.progress(perc,
-                                          text=f"Simulating {num_generations} generations, {int(round(perc * 100, 0))}% complete...")
-                # Update population
-                st.session_state['population'] = increase_generation(st.session_state['population'],
-                                                                     st.session_state['tourney_size'])
-                st.session_state['current_generation'] += 1 # Update generation
-
-                # Update energies
-                current_energy_stats = get_energy_statistics(st.session_state['population'])
-                st.session_state['energy_statistics'].append(current_energy_stats)
-
-                # Check for records
-                check_for_records(st.session_state['population'], st.session_state['current_generation'])
-
-            # Update scores
-            st.session_state['population_scores'] = [p.energy for p in st.session_state['population']]
-
-            # Clear progress bar
-            progress_bar.empty()
+        # BULK GENERATION (in a background job, the page polls it for snapshots)
+        if st.session_state['bulk_job'] is not None:
+            with pseudo_sidebar:
+                watch_bulk_job()
+        else:
+            with pseudo_sidebar.form(f"Bulk Generation"):
+                num_generations = st.slider("Number of Generations",
+                                            min_value=50, max_value=1000,
+                                            value=100, step=10, width='stretch')
+                stop_at_optimum = st.checkbox("Stop at Optimum", value=True,
+                                              help="Stop once the best score reaches the known optimum or the upper bound")
+                patience = st.slider("Patience", min_value=0, max_value=500, value=0, step=10, width='stretch',
+                                     help="Stop after this many generations without a new best score (0 = never)")
+                gen_start = st.form_submit_button("Multi-Generation Evolution")
 
-            # Save bulk runtime to show as toast
-            t1 = time.time()
-            st.session_state['runtime'] = f"Simulation complete! Runtime: {t1 - t0:.2f}s"
+            if gen_start:
+                start_bulk_job(num_generations, stop_at_optimum, patience)
 
-            # Update page
-            st.rerun()
+                # Update page
+                st.rerun()
 
 
 
@@ -265,6 +376,11 @@ def main():
                 c2.metric("H/P Ratio", round(st.session_state['sequence'].count('H')/st.session_state['sequence'].count('P'), 2))
                 st.write(f"Sequence: {st.session_state['sequence']}")
 
+                # Custom sequences: the exact optimum (short chains only), benchmarks have bm_max
+                if st.session_state['bm_max'] == "N/A":
+                    st.metric("Optimal Score", exact_score_label(),
+                             help=f"Exact optimum, searched for sequences up to {EXACT_MAX_LENGTH} long")
+
                 st.divider()
 
                 st.caption("Population")
@@ -273,13 +389,27 @@ def main():
                 c5.metric("Size", st.session_state['population_size'])
                 c6.metric("Tournament Size", st.session_state['tourney_size'])
 
+                # How often each move type is accepted (tune the pivot shares with this). The GA applies every
+                # mutation that is possible, so there it is the share of mutations that found a valid move.
+                if st.session_state['remc'] is not None:
+                    move_rates = st.session_state['remc'].acceptance_rates()[2]
+                else:
+                    move_rates = st.session_state['move_stats'].rates()
+
+                if move_rates:
+                    st.divider()
+
+                    st.caption("Move Acceptance")
+                    for col, (move_type, rate) in zip(st.columns(len(move_rates) or 1), move_rates.items()):
+                        col.metric(move_type.capitalize(), f"{rate:.0%}")
+
 
 
             if st.session_state['current_generation'] > 0 and st.session_state['bm_max'] != 'N/A':
                 with st.expander("🏆LEADERBOARD", expanded=False):
                     st.write("Want to submit your best score to the leaderboard?")
 
-                    iterations = st.session_state['best_score_gen'] * st.session_state['population_size']
+                    iterations = st.session_state['best_score_iterations']
 
                     st.caption("Composition")
                     c1, c2 = st.columns(2)
@@ -292,7 +422,10 @@ def main():
                     st.caption("Personal Best")
                     c3, c4 = st.columns(2)
 
-                    st.caption(f"Iterations = (Earliest generation # at time of highest score) x (Population size) = {st.session_state['best_score_gen']} x {st.session_state['population_size']} = {iterations}")
+                    if st.session_state['remc'] is not None:
+                        st.caption(f"Iterations = Monte Carlo steps over all replicas until the highest score = {iterations}")
+                    else:
+                        st.caption(f"Iterations = (Earliest generation # at time of highest score) x (Population size) = {st.session_state['best_score_gen']} x {st.session_state['population_size']} = {iterations}")
 
                     c3.metric("Highest Score", st.session_state['best_score_seen'])
                     c4.metric("Number of Iterations", iterations)
@@ -342,20 +475,243 @@ def reset_session_states():
     st.session_state['age_deaths'] = {}
     st.session_state['fitness_deaths'] = {}
     st.session_state['selection_differential'] = []
+    st.session_state['move_stats'] = MoveStats()
 
     # Leaderboard Tracking
     st.session_state['best_score_seen'] = 0
-    st.session_state['best_score_generation'] = None
+    st.session_state['best_score_gen'] = None
     st.session_state['best_score_coords'] = None
-
-def check_for_records(population: list, generation: int):
-    best_poly = max(population, key=lambda poly: poly.energy)
-    current_max = best_poly.energy
-
-    if current_max > st.session_state['best_score_seen']:
-        st.session_state['best_score_seen'] = current_max
-        st.session_state['best_score_gen'] = generation
-        st.session_state['best_score_coords'] = best_poly.coords
+    st.session_state['best_score_iterations'] = 0
+    st.session_state['rng_state'] = None
+
+def start_exact_search(mode: str, length: int, seed: int):
+    # This session's previous search stops (or never starts), so the shared solver process only ever works for
+    # the latest sequence of each session
+    if st.session_state['exact_solver'] is not None:
+        st.session_state['exact_solver'].cancel()
+        st.session_state['exact_cancel'].set()
+
+    st.session_state['exact_solver'] = None
+    st.session_state['exact_cancel'] = None
+    st.session_state['exact_max'] = None
+    st.session_state['exact_found'] = None
+
+    if mode == "Custom" and length <= EXACT_MAX_LENGTH:
+        st.session_state['exact_solver'], st.session_state['exact_cancel'] = start_exact_solver(
+            make_sequence(length, seed=seed))
+
+def check_exact_search():
+    # Picks up the exact solver's answer once it is done: the optimum if proven, else the best fold it found
+    solver = st.session_state['exact_solver']
+    if solver is not None and solver.done() and not solver.cancelled():
+        score, _, proven = solver.result()
+        st.session_state['exact_found'] = score
+        st.session_state['exact_max'] = score if proven else None
+        st.session_state['exact_solver'] = None
+        st.session_state['exact_cancel'] = None
+
+def exact_score_label():
+    if st.session_state['exact_max'] is not None:
+        return st.session_state['exact_max']
+    if st.session_state['exact_solver'] is not None:
+        return "Searching..."
+    if st.session_state['exact_found'] is not None:
+        return f">= {st.session_state['exact_found']}"
+
+    return "N/A"
+
+def set_offspring_pool(num_workers: int):
+    # One worker pool per session, replaced whenever a new simulation starts
+    if st.session_state['offspring_pool'] is not None:
+        st.session_state['offspring_pool'].close()
+
+    keep_resource('offspring_pool', OffspringPool(num_workers) if num_workers > 1 else None)
+
+def keep_resource(key: str, resource):
+    # Session state keys of engines and bulk jobs go through here, so they are closed with the session
+    st.session_state[key] = resource
+    st.session_state['session_resources'][key] = resource
+
+def close_engines():
+    # Stop the island processes / replica workers of the previous run
+    for engine in ('archipelago', 'remc'):
+        if st.session_state[engine] is not None:
+            st.session_state[engine].close()
+
+        keep_resource(engine, None)
+
+def engine_settings():
+    # What evolve_population needs from the session, read up front (a bulk job's thread can't read the session)
+    return {'remc': st.session_state['remc'],
+            'archipelago': st.session_state['archipelago'],
+            'pool': st.session_state['offspring_pool'],
+            'tourney_size': st.session_state['tourney_size'],
+            'memetic_steps': st.session_state['memetic_steps'],
+            'memetic_top_k': st.session_state['memetic_top_k'],
+            'move_mix': pivot_mix(st.session_state['mutation_pivot_share'])}
+
+def engine_processes(engines: dict):
+    # Processes a generation of these engines keeps busy (the job scheduler slots a bulk run of them takes)
+    if engines['archipelago'] is not None:
+        return len(engines['archipelago'].processes)
+    if engines['remc'] is not None:
+        return engines['remc'].num_workers
+    if engines['pool'] is not None:
+        return engines['pool'].num_workers
+
+    return 1
+
+def evolve_population(population: Population, state, remc = None, archipelago = None, pool = None,
+                      tourney_size: int = 3, memetic_steps: int = 0, memetic_top_k: int = None, move_mix: dict = None):
+    # One generation (one exchange round for replica exchange), on the islands if this run has them.
+    # state: where the death logs, selection differential and move statistics go (st.session_state, or a bulk
+    # job's RunState)
+    if remc is not None:
+        return remc.step()
+
+    if archipelago is not None:
+        archipelago.state = state
+        return archipelago.step()
+
+    return increase_generation(population, tourney_size, pool, state=state,
+                               memetic_steps=memetic_steps, memetic_top_k=memetic_top_k, move_mix=move_mix)
+
+def stop_targets(stop_at_optimum: bool):
+    # Target = the benchmark optimum, or the exact optimum of a short custom sequence once it is known
+    if not stop_at_optimum:
+        return None, None
+
+    target = st.session_state['bm_max'] if st.session_state['bm_max'] != "N/A" else st.session_state['exact_max']
+    upper_bound = st.session_state['population'].sequence.upper_bound
+
+    return target, upper_bound
+
+def check_for_records(population: Population, state, remc = None):
+    # record_best for the GA. Replica exchange tracks its own best fold mid-round, its iterations are the Monte
+    # Carlo steps over all replicas until then
+    if remc is None:
+        return record_best(population, state)
+
+    if remc.best_energy > state['best_score_seen']:
+        state['best_score_seen'] = remc.best_energy
+        state['best_score_gen'] = state['current_generation']
+        state['best_score_coords'] = remc.best_coords.copy()
+        state['best_score_iterations'] = remc.best_iterations
+
+def start_bulk_job(num_generations: int, stop_at_optimum: bool, patience: int):
+    # The job evolves its own copy of the run state, sync_bulk_job copies it back into the session.
+    # A GA run without worker processes goes to the shared scheduler's process pool, runs with engines (worker
+    # pool, islands, replica exchange) keep them in this process. Either way it waits for its turn on the scheduler,
+    # where it takes one slot per process its engines keep busy.
+    target, upper_bound = stop_targets(stop_at_optimum)
+    engines = engine_settings()
+    state = RunState.from_state(st.session_state)
+
+    if engines['remc'] is None and engines['archipelago'] is None:
+        settings = {'tourney_size': engines['tourney_size'],
+                    'pool': engines['pool'],
+                    'memetic_steps': engines['memetic_steps'],
+                    'memetic_top_k': engines['memetic_top_k'],
+                    'move_mix': engines['move_mix'],
+                    'target': target,
+                    'patience': patience or None,
+                    'stop_at_bound': upper_bound is not None,
+                    'checkpoint_path': checkpoint_path(st.session_state['session_id']),
+                    'checkpoint_every': CHECKPOINT_EVERY,
+                    'metadata': {'session': {key: st.session_state[key] for key in CHECKPOINT_SETTINGS}}}
+        job = EvolutionJob(st.session_state['population'], num_generations, state, settings=settings,
+                           scheduler=get_scheduler(), session=st.session_state['session_id'],
+                           rng_state=st.session_state['rng_state'], processes=engine_processes(engines))
+    else:
+        job = EvolutionJob(st.session_state['population'], num_generations, state,
+                           step=partial(evolve_population, **engines),
+                           record=partial(check_for_records, remc=engines['remc']),
+                           stop=partial(check_stop, target=target, upper_bound=upper_bound, patience=patience or None),
+                           scheduler=get_scheduler(), session=st.session_state['session_id'],
+                           processes=engine_processes(engines))
+
+    keep_resource('bulk_job', job)
+    st.session_state['bulk_job_synced'] = 0
+
+def sync_bulk_job():
+    # Latest snapshot of a running bulk job into the session (for the plots), or its final results once done
+    job = st.session_state['bulk_job']
+    if job is None:
+        return
+
+    # Job-relative count like the one watch_bulk_job compares against, read first so the snapshot is never older
+    generations_done = job.generations_done
+    if job.done():
+        population, state = job.population, job.state
+    else:
+        population, state = job.snapshot()
+
+    st.session_state['population'] = population
+    state.copy_into(st.session_state)
+    st.session_state['population_scores'] = population.energies.tolist()
+    st.session_state['bulk_job_synced'] = generations_done
+
+    if job.done():
+        keep_resource('bulk_job', None)
+        st.session_state['rng_state'] = job.rng.bit_generator.state
+
+        # Save bulk runtime to show as toast
+        st.session_state['runtime'] = f"Simulation complete! Runtime: {job.runtime():.2f}s"
+        if job.reason is not None:
+            st.session_state['runtime'] += f" (stopped early: {STOP_MESSAGES[job.reason]})"
+        st.toast(st.session_state['runtime'])
+
+        if job.error is not None:
+            st.error(f"Error: Bulk evolution failed: {job.error}")
+
+def resume_run():
+    # Back to the run saved in this run id's checkpoint: population, run state, random stream and settings
+    population, state, rng_state, metadata = load_checkpoint(checkpoint_path(st.session_state['session_id']))
+
+    reset_session_states()
+    for key, value in metadata['session'].items():
+        st.session_state[key] = value
+    st.session_state['num_islands'] = 1
+
+    set_offspring_pool(st.session_state['num_workers'])
+    close_engines()
+
+    mode = "Custom" if st.session_state['bm_max'] == "N/A" else "Benchmark Testing"
+    start_exact_search(mode, st.session_state['length'], st.session_state['seed'])
+
+    state.copy_into(st.session_state)
+    st.session_state['population'] = population
+    st.session_state['population_scores'] = population.energies.tolist()
+    st.session_state['rng_state'] = rng_state
+    st.session_state['expanded_settings'] = False
+    st.session_state['sim_initialized'] = True
+
+def cancel_bulk_job():
+    # Wait for the job to stop before its engines (worker pools, islands) get closed
+    if st.session_state['bulk_job'] is not None:
+        st.session_state['bulk_job'].cancel()
+        st.session_state['bulk_job'].join()
+        keep_resource('bulk_job', None)
+
+@st.fragment(run_every=BULK_POLL_INTERVAL)
+def watch_bulk_job():
+    # Polls the running bulk job: progress here, and a full page update whenever new generations are done
+    job = st.session_state['bulk_job']
+    if job is None:
+        return
+
+    position = job.position()
+    if position > 0:
+        st.progress(job.progress(), text=f"Waiting for a free slot: number {position} in line...")
+    else:
+        st.progress(job.progress(),
+                    text=f"Simulating {job.num_generations} generations, {int(round(job.progress() * 100, 0))}% complete...")
+
+    if st.button("Cancel", width='stretch'):
+        job.cancel()
+
+    if job.done() or job.generations_done > st.session_state['bulk_job_synced']:
+        st.rerun()
 
 @st.dialog(" ")
 def show_name_popup(name: str, anonymous: bool):
@@ -1,58 +1,59 @@
-import random
-
 import numpy as np
-import streamlit as st
 
-from utils.initialization import madras_sokal_init, ms_mutate
+from sequence import Sequence
+from utils.initialization import madras_sokal_init
+from utils.lattice import COORD_DTYPE, decode_genome, encode_genome
 from utils.physics import calculate_energy_vectorized
 
 
 class Polymer:
-    # Named sequence that is shared
-    names = None
-    length = None
-
     # Mega mutations
     mega_rate = 0.01
     mega_num = 10
 
+    # Move types a child's mutation draws from, {move type: relative weight} (see MOVES in utils/initialization.py)
+    move_mix = {"pivot": 1.0}
+
+    # How strongly new random polymers are grown towards H-H contacts (0 = uniform self-avoiding walks)
+    growth_bias = 0.5
+
     @classmethod
-    def encode_sequence(cls, chain_len: int, seq: str):
-        cls.length = chain_len
-        cls.names = np.array(list(seq)) # str to np.ndarray
+    def from_genome(cls, sequence: Sequence, genome: np.ndarray, origin: np.ndarray = None, energy: int = None):
+        # Rebuild a polymer from its packed 2-bit genome (first bead at origin, default 0, 0)
+        return cls(sequence, coords=decode_genome(genome[None], sequence.length, origin)[0], energy=energy)
 
-    def __init__(self, coords: np.ndarray = None):
-        # Make sure that they have a name and length (Polymer.encode_sequence(length, seq) has been run!)
-        if Polymer.names is None or Polymer.length is None:
-            raise ValueError("Error: Length and names MUST be initialized using the class method Polymer.encode_sequence before class instances are allowed.")
+    def __init__(self, sequence: Sequence, coords: np.ndarray = None, energy: int = None):
+        # Every polymer points at the (shared, immutable) sequence it folds
+        if not isinstance(sequence, Sequence):
+            raise ValueError(f"Error: Polymer needs a Sequence, not {type(sequence).__name__}.")
+        self.sequence = sequence
 
         if coords is None:
-            self.coords = madras_sokal_init(Polymer.length)
+            self.coords = madras_sokal_init(sequence.length)
         else:
-            self.coords = coords
+            self.coords = np.asarray(coords, dtype=COORD_DTYPE) # no copy if already integer lattice coords
 
-        self.energy = calculate_energy_vectorized(self.coords, Polymer.names)
+        # Energy is evaluated lazily: None means "not known yet", filled in on first access
+        self._energy = energy
         self.age = 0
         self.mega_mode = False
 
-    def reproduce(self):
-        child = Polymer(coords = self.coords.copy())
-
-        # If the parent is old, their child has a chance to mega mutate
-        # Goal: reintroduce diversity and get out of local minima
-        if self.age >= 10:
-            child.mega_mode = True
+    @property
+    def names(self):
+        return self.sequence.names
 
-        child.mutate()
+    @property
+    def energy(self):
+        if self._energy is None:
+            self._energy = calculate_energy_vectorized(self.coords, self.sequence)
 
-        return child
+        return self._energy
 
-    def mutate(self):
-        # If mega mutation status is True, then we have this probability of hitting the "jackpot"
-        if self.mega_mode and random.random() < Polymer.mega_rate:
-            for _ in range(Polymer.mega_num):
-                self.coords = ms_mutate(self.coords)
-        else:
-            self.coords = ms_mutate(self.coords)
+    @energy.setter
+    def energy(self, energy: int):
+        self._energy = energy
 
-        self.energy = calculate_energy_vectorized(self.coords, Polymer.names)
\ No newline at end of file
+    @property
+    def genome(self):
+        # Packed relative-turn encoding of the fold: N / 4 bytes instead of 4N bytes of coordinates
+        return encode_genome(self.coords[None])[0]
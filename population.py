@@ -0,0 +1,184 @@
+import numpy as np
+
+from polymer import Polymer
+from sequence import Sequence
+from utils.initialization import (MoveStats, get_rng, hill_climb_batch, pivot_move_batch, random_move_batch,
+                                  rosenbluth_init)
+from utils.lattice import COORD_DTYPE, decode_genome, encode_genome
+from utils.physics import calculate_energy_batch
+
+
+class Population:
+    # Struct-of-arrays population: one preallocated (capacity, N, 2) coordinate buffer plus energy/age/mega arrays.
+    # Only the first `size` rows are alive. Selection, aging, death and reproduction are index operations on
+    # these arrays instead of loops over Polymer objects.
+    def __init__(self, sequence: Sequence, capacity: int):
+        if not isinstance(sequence, Sequence):
+            raise ValueError(f"Error: Population needs a Sequence, not {type(sequence).__name__}.")
+        self.sequence = sequence
+
+        self._coords = np.zeros((capacity, sequence.length, 2), dtype=COORD_DTYPE)
+        self._energies = np.zeros(capacity, dtype=int)
+        self._ages = np.zeros(capacity, dtype=int)
+        self._mega = np.zeros(capacity, dtype=bool)
+        self.size = 0
+
+    @classmethod
+    def random(cls, sequence: Sequence, size: int, capacity: int = None):
+        population = cls(sequence, capacity or size)
+        population.grow(size)
+
+        return population
+
+    @classmethod
+    def from_genomes(cls, sequence: Sequence, genomes: np.ndarray, energies: np.ndarray, ages: np.ndarray,
+                     mega: np.ndarray, capacity: int = None):
+        # Rebuild a population stored compactly with Population.genomes (translation is not kept)
+        population = cls(sequence, capacity or len(genomes))
+        population.append(decode_genome(genomes, sequence.length), energies)
+        population.ages[:] = ages
+        population.mega[:] = mega
+
+        return population
+
+    # Views of the living members
+    @property
+    def capacity(self):
+        return self._coords.shape[0]
+
+    @property
+    def coords(self):
+        return self._coords[:self.size]
+
+    @property
+    def energies(self):
+        return self._energies[:self.size]
+
+    @property
+    def ages(self):
+        return self._ages[:self.size]
+
+    @property
+    def mega(self):
+        return self._mega[:self.size]
+
+    def __len__(self):
+        return self.size
+
+    def genomes(self):
+        # (size, N / 4) packed 2-bit genomes of the living members, for compact storage
+        return encode_genome(self.coords)
+
+    def copy(self):
+        # Independent copy with the same capacity (e.g. a snapshot of a population another thread keeps evolving)
+        population = Population(self.sequence, self.capacity)
+        population.append(self.coords, self.energies)
+        population.ages[:] = self.ages
+        population.mega[:] = self.mega
+
+        return population
+
+    def polymer(self, idx: int):
+        # Standalone Polymer copy of one member (for plotting, records, the leaderboard...)
+        polymer = Polymer(self.sequence, coords=self._coords[idx].copy(), energy=self._energies[idx])
+        polymer.age = self._ages[idx]
+        polymer.mega_mode = self._mega[idx]
+
+        return polymer
+
+    def append(self, coords: np.ndarray, energies: np.ndarray = None):
+        # New members (age 0) go right after the living ones
+        num_new = coords.shape[0]
+        if self.size + num_new > self.capacity:
+            raise ValueError(f"Error: Population capacity {self.capacity} exceeded.")
+
+        if energies is None:
+            energies = calculate_energy_batch(coords, self.sequence)
+
+        new = slice(self.size, self.size + num_new)
+        self._coords[new] = coords
+        self._energies[new] = energies
+        self._ages[new] = 0
+        self._mega[new] = False
+        self.size += num_new
+
+        return self
+
+    def grow(self, num_polymers: int, rng: np.random.Generator = None):
+        # Add random polymers, grown by PERM chain growth and scored together
+        coords = rosenbluth_init(self.sequence.length, num_polymers, names=self.sequence.names,
+                                 bias=Polymer.growth_bias, rng=rng)
+
+        return self.append(coords)
+
+    def keep(self, idxs: np.ndarray):
+        # Keep only these members (in this order), packed at the front of the buffers
+        num_kept = len(idxs)
+
+        self._coords[:num_kept] = self._coords[idxs]
+        self._energies[:num_kept] = self._energies[idxs]
+        self._ages[:num_kept] = self._ages[idxs]
+        self._mega[:num_kept] = self._mega[idxs]
+        self.size = num_kept
+
+        return self
+
+    def hill_climb(self, idxs: np.ndarray, num_steps: int, rng: np.random.Generator = None):
+        # Greedy local search on these members (memetic stage), scored with incremental deltas
+        coords = self._coords[idxs]
+        energies = self._energies[idxs]
+
+        hill_climb_batch(coords, energies, self.sequence, num_steps, rng)
+
+        self._coords[idxs] = coords
+        self._energies[idxs] = energies
+
+        return self
+
+    def reproduce(self, pool=None, move_mix: dict = None, rng: np.random.Generator = None,
+                  move_stats: MoveStats = None):
+        # Every living member gets ONE mutated child, written right after the parents. Its move type is drawn
+        # from move_mix (default Polymer.move_mix, see MOVES in utils/initialization.py).
+        # With an OffspringPool (utils/parallel.py) the children are mutated and scored in worker processes
+        # (on their own streams, rng only draws the jackpots then). The mutations are counted in move_stats, if given.
+        rng = get_rng(rng)
+        num_parents = self.size
+        parents = slice(0, num_parents)
+        children = slice(num_parents, 2 * num_parents)
+
+        if 2 * num_parents > self.capacity:
+            raise ValueError(f"Error: Population capacity {self.capacity} too small for {num_parents} children.")
+
+        self._coords[children] = self._coords[parents]
+        self._ages[children] = 0
+
+        # If the parent is old, their child has a chance to mega mutate
+        # Goal: reintroduce diversity and get out of local minima
+        self._mega[children] = self._ages[parents] >= 10
+        jackpot = self._mega[children] & (rng.random(num_parents) < Polymer.mega_rate)
+
+        child_coords = self._coords[children]
+        move_mix = move_mix or Polymer.move_mix
+        if pool is None:
+            self._energies[children] = mutate_children(child_coords, jackpot, self.sequence, move_mix, rng, move_stats)
+        else:
+            self._energies[children] = pool.mutate(child_coords, jackpot, self.sequence, move_mix, move_stats)
+
+        self.size = 2 * num_parents
+
+        return self
+
+
+def mutate_children(coords_batch: np.ndarray, jackpot: np.ndarray, sequence: Sequence, move_mix: dict = None,
+                    rng: np.random.Generator = None, move_stats: MoveStats = None):
+    # One move per child (in place) drawn from move_mix (default Polymer.move_mix), the rest of the mega mutation
+    # pivots on just the jackpot children. Returns the children's energies (the first moves go into move_stats).
+    random_move_batch(coords_batch, move_mix or Polymer.move_mix, rng, move_stats)
+
+    if np.any(jackpot):
+        mega_coords = coords_batch[jackpot]
+        for _ in range(Polymer.mega_num - 1):
+            pivot_move_batch(mega_coords, rng=rng)
+        coords_batch[jackpot] = mega_coords
+
+    return calculate_energy_batch(coords_batch, sequence)
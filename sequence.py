@@ -0,0 +1,67 @@
+import random
+import sys
+
+import numpy as np
+
+from utils.enumeration import parity_upper_bound
+
+
+class Sequence:
+    # Immutable HP sequence for ONE run, shared by every polymer/population folding it.
+    # Holds the precomputed H mask and H indices the energy kernels need, so several runs
+    # (Lab, Simulation, other users, worker processes) can fold different sequences side by side.
+    def __init__(self, seq: str):
+        names = np.array(list(seq)) # str to np.ndarray
+        h_mask = (names == 'H')
+        h_indices = np.where(h_mask)[0]
+
+        for array in (names, h_mask, h_indices):
+            array.flags.writeable = False
+
+        object.__setattr__(self, 'string', seq)
+        object.__setattr__(self, 'names', names)
+        object.__setattr__(self, 'h_mask', h_mask)
+        object.__setattr__(self, 'h_indices', h_indices)
+        object.__setattr__(self, 'length', len(seq))
+
+        # Palindromic sequences look the same read backwards, so a reversed fold is the same fold
+        object.__setattr__(self, 'is_palindrome', seq == seq[::-1])
+
+        # No fold of this sequence can score more than this (see parity_upper_bound)
+        object.__setattr__(self, 'upper_bound', parity_upper_bound(names))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Error: Sequence is immutable, make a new Sequence instead.")
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return self.string
+
+    def __eq__(self, other):
+        return isinstance(other, Sequence) and self.string == other.string
+
+    def __hash__(self):
+        return hash(self.string)
+
+    def __reduce__(self):
+        # Rebuild from the string when pickled (worker processes, session state)
+        return (Sequence, (self.string,))
+
+
+def make_sequence(length: int, names = None, seed: int = None):
+    # If sequence is defined already, don't change it (regardless if seed exists; presence of sequence > seed)
+    if names is not None:
+        target_seq = names
+
+    # If seq not defined, make a random seq with seed.
+    else:
+        if seed is None: # If no seed, make a seed
+            seed = random.randint(0, sys.maxsize)
+
+        # Make random sequence with seed, to a STRING
+        rng = np.random.default_rng(seed)
+        target_seq = "".join(rng.choice(['P', 'H'], size=length))
+
+    return target_seq
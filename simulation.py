@@ -1,38 +1,102 @@
-import random
-import sys
+import os
 import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
 
 import numpy as np
 import streamlit as st
 
+from core.scheduler import JobScheduler
 from polymer import Polymer
+from population import Population
+from sequence import Sequence, make_sequence
+from utils.enumeration import EXACT_TIME_LIMIT, optimal_fold
+from utils.initialization import pivot_mix
+from utils.islands import Archipelago
+from utils.lattice import COORD_DTYPE
+from utils.remc import ReplicaExchange
 from utils.session_state_helpers import track_progress
 
+GROWTH_BATCH_SIZE = 100
+
+# Processes the bulk runs of all sessions together keep busy at once (a run with engines counts each of their
+# worker / island processes), the other runs wait in the scheduler's line
+MAX_RUNNING_JOBS = os.cpu_count() or 1
+
+# Where GA bulk runs are saved (one .npz per run id)
+CHECKPOINT_DIR = "checkpoints"
+
+
+@st.cache_resource
+def get_solver_pool():
+    # One background process for the exact solver, shared by every session
+    return ProcessPoolExecutor(max_workers=1)
+
+@st.cache_resource
+def get_solver_manager():
+    # Serves the cancel events of the exact searches (a plain Event can't be sent to a pool worker)
+    return Manager()
+
+@st.cache_resource
+def get_scheduler():
+    # One job scheduler (and process pool) for the bulk runs of every session
+    return JobScheduler(max_running=MAX_RUNNING_JOBS)
+
+def checkpoint_path(run_id: str):
+    return os.path.join(CHECKPOINT_DIR, f"{run_id}.npz")
+
+def start_exact_solver(target_seq: str, time_limit: float = EXACT_TIME_LIMIT):
+    # True optimum of a short custom sequence, searched in the background while the parents are generated.
+    # Returns (future, cancel event): the future's result is (best score, best coords, proven), and setting the
+    # event stops the search even once it is running (Future.cancel only drops it while it still waits).
+    cancel_event = get_solver_manager().Event()
+    future = get_solver_pool().submit(optimal_fold, np.array(list(target_seq)), time_limit, cancel_event=cancel_event)
+
+    return future, cancel_event
 
 def start_sim(pop_size: int, length: int, names = None, seed: int = None, container = None):
     if pop_size % 2 == 1:
         raise ValueError(f"Error: Population size {pop_size} must be an even integer.")
 
-    # If sequence is defined already, don't change it (regardless if seed exists; presence of sequence > seed)
-    if names is not None:
-        target_seq = names
+    target_seq = make_sequence(length, names, seed)
 
-    # If seq not defined, make a random seq with seed.
-    else:
-        if seed is None: # If no seed, make a seed
-            seed = random.randint(0, sys.maxsize)
+    # Every polymer of this run shares the one Sequence, nothing is stored on the Polymer class
+    sequence = Sequence(target_seq)
 
-        # Make random sequence with seed, to a STRING
-        rng = np.random.default_rng(seed)
-        target_seq = "".join(rng.choice(['P', 'H'], size=length))
+    # Grow the parents in batches (one chain growth run each) so the progress bar still moves
+    batch_sizes = [min(GROWTH_BATCH_SIZE, pop_size - start) for start in range(0, pop_size, GROWTH_BATCH_SIZE)]
 
-    # NECESSARY WHENEVER CREATE POLYMER...
-    Polymer.encode_sequence(chain_len=length, seq=target_seq)
-
-    population = [Polymer() for _ in track_progress(range(pop_size), text="Generating Parents", container=container)]
+    population = Population(sequence, capacity=pop_size)
+    for batch_size in track_progress(batch_sizes, text="Generating Parents", container=container):
+        population.grow(batch_size)
 
     return population, target_seq
 
+def start_islands(pop_size: int, length: int, num_islands: int, tourney_size: int, migration_interval: int,
+                  num_migrants: int, names = None, seed: int = None, memetic_steps: int = 0, memetic_top_k: int = None,
+                  state = None, move_mix: dict = None):
+    # Island mode: the population is split evenly over num_islands processes (each island size rounded down to even)
+    island_size = 2 * (pop_size // (2 * num_islands))
+
+    target_seq = make_sequence(length, names, seed)
+    archipelago = Archipelago(Sequence(target_seq), num_islands, island_size, tourney_size,
+                              migration_interval=migration_interval, num_migrants=num_migrants,
+                              state=state, memetic_steps=memetic_steps, memetic_top_k=memetic_top_k,
+                              move_mix=move_mix)
+
+    return archipelago, target_seq
+
+def start_remc(length: int, num_replicas: int, t_min: float, t_max: float, steps_per_exchange: int,
+               pivot_share: float = 0.5, num_workers: int = 1, names = None, seed: int = None):
+    # Replica-exchange Monte Carlo instead of the GA: the replicas play the role of the population
+    target_seq = make_sequence(length, names, seed)
+
+    remc = ReplicaExchange(Sequence(target_seq), num_replicas, t_min=t_min, t_max=t_max,
+                           steps_per_exchange=steps_per_exchange, move_mix=pivot_mix(pivot_share),
+                           num_workers=num_workers)
+
+    return remc, target_seq
+
 def start_lab():
     length = st.session_state['length_lab']
     seed = st.session_state['seed_lab']
@@ -40,13 +104,15 @@ def start_lab():
     rng = np.random.default_rng(seed)
     target_seq = "".join(rng.choice(['P', 'H'], size=length))
 
-    Polymer.encode_sequence(chain_len=length, seq=target_seq)
+    sequence = Sequence(target_seq)
 
-    coords = np.zeros((length, 2))
+    coords = np.zeros((length, 2), dtype=COORD_DTYPE)
     coords[:, 1] = np.arange(length)
     poly_coords = coords
 
-    st.session_state['lab_polymer'] = Polymer(poly_coords)
-    st.session_state['lab_sequence'] = Polymer.names
+    st.session_state['lab_polymer'] = Polymer(sequence, poly_coords)
+    st.session_state['lab_sequence'] = sequence.names
+
+    # History snapshots are (first bead, packed genome) pairs instead of full coordinate copies
     st.session_state['lab_history'] = []
-    st.session_state['lab_history'].append(poly_coords.copy())
\ No newline at end of file
+    st.session_state['lab_history'].append((poly_coords[0].copy(), st.session_state['lab_polymer'].genome))
\ No newline at end of file
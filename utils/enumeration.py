@@ -0,0 +1,138 @@
+import sys
+import time
+
+import numpy as np
+
+from utils.lattice import COORD_DTYPE
+
+# Longest chains the exact solver is started for (the search grows exponentially with length: random sequences
+# of 16 beads are proven in under 2 s, 18 beads can take 15 s and 20 beads 20 s or more), and how long it may
+# search in the background before settling for the best fold found
+EXACT_MAX_LENGTH = 16
+EXACT_TIME_LIMIT = 120
+
+DIRECTIONS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+
+def contact_capacity(names: np.ndarray):
+    # Most contacts each bead can ever have: free neighbour sites of an H bead (3 at the ends, 2 inside), 0 for P
+    length = len(names)
+    capacity = np.where(names == 'H', 2, 0)
+    capacity[[0, length - 1]] += (names[[0, length - 1]] == 'H')
+
+    return capacity
+
+def parity_upper_bound(names: np.ndarray):
+    # Fast analytic bound for any HP sequence: every contact joins an even and an odd H bead, so there can't be
+    # more contacts than the even H beads (or the odd H beads) have free neighbour sites in total
+    names = np.asarray(names)
+    capacity = contact_capacity(names)
+    even = np.arange(len(names)) % 2 == 0
+
+    return int(min(capacity[even].sum(), capacity[~even].sum()))
+
+def optimal_fold(names: np.ndarray, time_limit: float = None, lower_bound: int = 0, cancel_event = None):
+    # Exact maximum number of H-H contacts by depth-first enumeration of self-avoiding walks, with
+    # - symmetry breaking: the first bond points right and the first turn goes up (1 of the 8 lattice symmetries)
+    # - branch and bound: a branch is cut as soon as (contacts so far + upper bound on contacts still possible)
+    #   can't beat the best fold found so far
+    # Upper bound: contacts only join even and odd beads on the square lattice. Every future contact uses an
+    # even and an odd "slot" (free neighbour site), at least one of them on a bead that is not placed yet.
+    # Returns (best score, best coords, proven). proven is False if time_limit (seconds) ran out first, then the
+    # score is only the best fold found. lower_bound: a score already known to be reachable (e.g. from the GA).
+    # cancel_event (threading / multiprocessing Event): once set, the search stops like it does at the time limit.
+    names = np.asarray(names)
+    length = len(names)
+    is_h = [name == 'H' for name in names]
+
+    capacity = contact_capacity(names)
+    even = np.arange(length) % 2 == 0
+    # Slots of the beads from k onwards, per parity
+    remaining_even = np.append(np.cumsum(np.where(even, capacity, 0)[::-1])[::-1], 0).tolist()
+    remaining_odd = np.append(np.cumsum(np.where(~even, capacity, 0)[::-1])[::-1], 0).tolist()
+
+    best = {'score': lower_bound - 1, 'path': None}
+    deadline = None if time_limit is None else time.time() + time_limit
+    nodes = 0
+
+    occupied = {(0, 0): 0, (1, 0): 1}
+    path = [(0, 0), (1, 0)]
+
+    def neighbors_at(site):
+        # (occupied neighbour sites, H beads among them)
+        x, y = site
+        num_occupied, num_h = 0, 0
+        for dx, dy in DIRECTIONS:
+            j = occupied.get((x + dx, y + dy))
+            if j is not None:
+                num_occupied += 1
+                num_h += is_h[j]
+        return num_occupied, num_h
+
+    def search(k, score, turned, free_even, free_odd):
+        # free_even / free_odd: free neighbour sites of the placed H beads of that parity
+        nonlocal nodes
+        if k == length:
+            if score > best['score']:
+                best['score'], best['path'] = score, list(path)
+            return
+
+        nodes += 1
+        if nodes % 4096 == 0 and ((deadline is not None and time.time() > deadline)
+                                  or (cancel_event is not None and cancel_event.is_set())):
+            raise TimeoutError
+
+        # Upper bound on the final score from here. The chain tip keeps one free site for the bond to bead k.
+        tip_even = is_h[k - 1] and k % 2 == 1
+        tip_odd = is_h[k - 1] and k % 2 == 0
+        bound = min(remaining_even[k] + remaining_odd[k],
+                    remaining_even[k] + free_even - tip_even,
+                    remaining_odd[k] + free_odd - tip_odd)
+        if score + bound <= best['score']:
+            return
+
+        # Try the sites with the most new contacts first, so good folds (and tight cuts) come early
+        x, y = path[-1]
+        options = []
+        for dx, dy in DIRECTIONS:
+            site = (x + dx, y + dy)
+            if site in occupied or (not turned and dy < 0): # before the first turn, only turn up
+                continue
+
+            # Bead k touches its occupied neighbours (all of the other parity), minus the bond to bead k - 1.
+            # Its own free sites join its parity, the H neighbours each lose one.
+            num_occupied, num_h = neighbors_at(site)
+            if is_h[k]:
+                gained, own_free = num_h - is_h[k - 1], 4 - num_occupied
+            else:
+                gained, own_free = 0, 0
+
+            if k % 2 == 0:
+                options.append((gained, site, turned or dy != 0, free_even + own_free, free_odd - num_h))
+            else:
+                options.append((gained, site, turned or dy != 0, free_even - num_h, free_odd + own_free))
+        options.sort(key=lambda option: option[0], reverse=True)
+
+        for gained, site, now_turned, new_free_even, new_free_odd in options:
+            occupied[site] = k
+            path.append(site)
+            search(k + 1, score + gained, now_turned, new_free_even, new_free_odd)
+            path.pop()
+            del occupied[site]
+
+    # Beads 0 and 1 sit at (0, 0) and (1, 0): each has 3 free sites around the bond they share
+
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(recursion_limit, length + 100))
+    try:
+        search(2, 0, False, 3 * is_h[0], 3 * is_h[1])
+        proven = True
+    except TimeoutError:
+        proven = False
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+
+    if best['path'] is None: # nothing beat lower_bound - 1 (only possible with a lower bound)
+        return lower_bound, None, proven
+
+    return best['score'], np.array(best['path'], dtype=COORD_DTYPE), proven
@@ -1,123 +1,165 @@
-import random
-
 import numpy as np
-import streamlit as st
 
-from polymer import Polymer
-from utils.session_state_helpers import (update_death_log,
-                                         update_selection_differential)
+from core.run_state import merge_move_stats, update_death_log, update_selection_differential
+from population import Population
+from utils.initialization import MoveStats, get_rng
+from utils.lattice import canonical_form
+from utils.parallel import OffspringPool
 
 
-def select_parents(population: list, tourney_size: int = 3):
-    parents = []
+def select_parents(population: Population, tourney_size: int = 3, state: dict = None,
+                   rng: np.random.Generator = None):
     original_pop_size = len(population)
-    pop_fitness = [p.energy for p in population]
+    pop_fitness = population.energies.mean()
 
     # st.write(f"Original pop size: {original_pop_size}")
     # Get rid of clones (increase genetic diversity)
-    new_population = remove_clones(population)
-    # st.write(f"Clone-pruned pop size: {len(new_population)}")
+    remove_clones(population)
+    # st.write(f"Clone-pruned pop size: {len(population)}")
 
 
     # Elite selection: keep the best parent ALWAYS, regardless of age
     # DANGEROUS: IS ETERNAL SELECTION!!
-    # best_poly = max(population, key=lambda poly: poly.energy)
-    # parents.append(best_poly)
-    # population.remove(best_poly)
+    # best_idx = np.argmax(population.energies)
 
 
     # Eliminate perennial polymers, but also randomly eliminates children
-    population = remove_elderly(population=new_population, aging_rate=0.04, base_risk=0.005)
+    remove_elderly(population=population, aging_rate=0.04, base_risk=0.005, state=state, rng=rng)
 
     # Regenerate population to original size with random new polymers
-    while (len(population) < original_pop_size):
-        population.append(Polymer())
+    if len(population) < original_pop_size:
+        population.grow(original_pop_size - len(population), rng)
 
 
     # Tournament selection without replacement
-    for i in range(original_pop_size // 2):
-        candidates_idxs = random.sample(range(len(population)), k = tourney_size) # k random candidates
-        best_candidate_idx = max(candidates_idxs, key=lambda idx: population[idx].energy) # Best candidate index
-        parents.append(population[best_candidate_idx]) # Add winner to parents
-
-        # Now, instead of removing polymer, we will swap winner with last polymer for speed (python has to go over list many times for pop)
-        # order in population does not matter in tournament selection
-        last_idx = len(population) - 1
-
-        # If winner is not already last index, swap him
-        if best_candidate_idx != last_idx:
-            population[best_candidate_idx], population[last_idx] = population[last_idx], population[best_candidate_idx]
+    winners, remaining = tournament_select(population.energies, num_winners=original_pop_size // 2,
+                                           tourney_size=tourney_size, rng=rng)
 
-        population.pop() # pop the winner
-
-    update_death_log(population=population, session_state='fitness_deaths')
-    parents_fitness = [p.energy for p in parents]
+    update_death_log(ages=population.ages[remaining], session_state='fitness_deaths', state=state)
+    population.keep(winners)
 
     # Difference between mean fitness of parents - original population
-    selection_differential = sum(parents_fitness) / len(parents) - sum(pop_fitness) / original_pop_size
-    update_selection_differential(selection_differential=selection_differential)
-
-
-    return parents
+    selection_differential = population.energies.mean() - pop_fitness
+    update_selection_differential(selection_differential=selection_differential, state=state)
 
-def generate_offspring(parents: list):
-    # takes in parents list of length n
-    # for each parent, mutates their coordinates ONCE with an algorithm
-    # returns list containing parents & their children (length 2n)
-    population = parents.copy()
-
-    for parent in parents:
-        child = parent.reproduce()
-        population.append(child)
 
     return population
 
-def increase_generation(population: list, tourney_size: int):
-    parents = select_parents(population, tourney_size)
+def tournament_select(energies: np.ndarray, num_winners: int, tourney_size: int = 3, rng: np.random.Generator = None):
+    # Vectorized tournament selection without replacement: returns (winner indices, loser indices).
+    # Each round runs all outstanding tournaments at once as a (tournaments, tourney_size) index matrix,
+    # picks every winner with argmax, and removes the winners from the pool in bulk. A polymer that wins
+    # several tournaments in the same round only counts once, so its extra tournaments are rerun next round.
+    remaining = np.arange(len(energies))
+    winners = []
+    num_needed = min(num_winners, len(energies))
+
+    while num_needed > 0:
+        group_size = min(tourney_size, len(remaining))
+
+        groups = draw_groups(len(remaining), num_needed, group_size, rng) # positions in remaining
+        best = groups[np.arange(num_needed), np.argmax(energies[remaining[groups]], axis=1)]
+
+        round_winners = np.unique(best)
+        winners.append(remaining[round_winners])
+        remaining = np.delete(remaining, round_winners)
+        num_needed -= len(round_winners)
+
+    winners = np.concatenate(winners) if winners else np.zeros(0, dtype=int)
+
+    return winners, remaining
+
+def draw_groups(pool_size: int, num_groups: int, group_size: int, rng: np.random.Generator = None):
+    # (num_groups, group_size) matrix of random indices below pool_size, distinct within each row.
+    # Rows are drawn with replacement, and only the (few) rows that repeat an index get redrawn exactly
+    # by taking the smallest of pool_size random keys.
+    rng = get_rng(rng)
+    groups = rng.integers(0, pool_size, size=(num_groups, group_size))
+
+    sorted_groups = np.sort(groups, axis=1)
+    repeats = np.any(sorted_groups[:, 1:] == sorted_groups[:, :-1], axis=1)
+
+    if np.any(repeats):
+        keys = rng.random((np.count_nonzero(repeats), pool_size))
+        groups[repeats] = np.argpartition(keys, group_size - 1, axis=1)[:, :group_size]
+
+    return groups
+
+def generate_offspring(parents: Population, pool: OffspringPool = None, move_mix: dict = None,
+                       rng: np.random.Generator = None, move_stats: MoveStats = None):
+    # takes in parents population of size n
+    # for each parent, mutates a copy of their coordinates ONCE with an algorithm (in worker processes if pool)
+    # returns the same population containing parents & their children (size 2n)
+    return parents.reproduce(pool, move_mix, rng, move_stats)
+
+def improve_offspring(population: Population, num_steps: int, top_k: int = None, rng: np.random.Generator = None):
+    # Memetic stage: greedy hill climbing on the children (second half), or only on the top_k best children
+    num_parents = len(population) // 2
+    children = np.arange(num_parents, len(population))
+
+    if top_k is not None and top_k < len(children):
+        best = np.argpartition(population.energies[children], -top_k)[-top_k:]
+        children = children[best]
+
+    return population.hill_climb(children, num_steps, rng)
+
+def increase_generation(population: Population, tourney_size: int, pool: OffspringPool = None, state: dict = None,
+                        memetic_steps: int = 0, memetic_top_k: int = None, move_mix: dict = None,
+                        rng: np.random.Generator = None):
+    # state: where the death logs, selection differential and move statistics go (a RunState, st.session_state or
+    # an island's log dict; None = not recorded)
+    # memetic_steps > 0 adds a hill climbing stage on the offspring (all of them, or the memetic_top_k best)
+    # move_mix: move types the children's mutations draw from (default Polymer.move_mix)
+    # rng: the generator every random draw of this generation comes from (default the shared one)
+    parents = select_parents(population, tourney_size, state, rng)
     parents = increase_age(parents)
-    next_gen = generate_offspring(parents)
+    move_stats = MoveStats()
+    next_gen = generate_offspring(parents, pool, move_mix, rng, move_stats)
+    merge_move_stats(move_stats, state)
+
+    if memetic_steps > 0:
+        next_gen = improve_offspring(next_gen, memetic_steps, memetic_top_k, rng)
 
     return next_gen
 
-def increase_age(population: list):
-    for polymer in population:
-        polymer.age += 1
+def stop_reason(best_score: int, target: int = None, upper_bound: int = None, stale_generations: int = 0,
+                patience: int = None):
+    # Why evolution can stop now (None = keep going): the target score (known optimum) was reached, the
+    # upper bound was reached (nothing can beat it), or there was no improvement for `patience` generations
+    if target is not None and best_score >= target:
+        return "target"
+    if upper_bound is not None and best_score >= upper_bound:
+        return "bound"
+    if patience is not None and stale_generations >= patience:
+        return "patience"
 
-    return population
+    return None
 
-def remove_clones(population: list):
-    unique_pop = []
-    shapes_hash = set()
+def increase_age(population: Population):
+    population.ages[:] += 1
 
-    for polymer in population:
-        # Set first coordinate to origin to account for translation shifts
-        relative_coords = polymer.coords - polymer.coords[0]
-
-        # Hashable array
-        shape = relative_coords.tobytes()
+    return population
 
-        if shape not in shapes_hash:
-            shapes_hash.add(shape)
-            unique_pop.append(polymer)
+def remove_clones(population: Population):
+    # Canonical shape of every fold at once, so translated, rotated and reflected copies (and, for palindromic
+    # sequences, reversed copies) all count as the same fold
+    shapes = canonical_form(population.coords, reversible=population.sequence.is_palindrome)
 
-    return unique_pop
+    # Keep the first copy of each shape (in population order)
+    _, first_idxs = np.unique(shapes, axis=0, return_index=True)
 
-def remove_elderly(population: list, aging_rate: float = 0.1, base_risk: float = 0.01):
-    alive = []
-    dead = []
-    for polymer in population:
-        poly_age = polymer.age
+    return population.keep(np.sort(first_idxs))
 
-        # Assign death probability based on age
-        death_probability = base_risk * np.exp(aging_rate * poly_age)
+def remove_elderly(population: Population, aging_rate: float = 0.1, base_risk: float = 0.01, state: dict = None,
+                   rng: np.random.Generator = None):
+    # Assign death probability based on age
+    death_probability = base_risk * np.exp(aging_rate * population.ages)
 
-        # 0 to 1 random roll
-        if random.random() > death_probability:  # If polymer survived
-            alive.append(polymer)
-        else:
-            dead.append(polymer)
+    # 0 to 1 random roll
+    rng = get_rng(rng)
+    survived = rng.random(len(population)) > death_probability
 
     # Update death log for this session state ( i do NOT want to call st.session_state here...)
-    update_death_log(population=dead, session_state='age_deaths')
+    update_death_log(ages=population.ages[~survived], session_state='age_deaths', state=state)
 
-    return alive
\ No newline at end of file
+    return population.keep(np.flatnonzero(survived))
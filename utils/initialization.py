@@ -1,28 +1,44 @@
 import random
 
 import numpy as np
-import streamlit as st
+
+from utils.lattice import COORD_DTYPE, STEPS, Occupancy, overlaps, pack_keys, search_keys, sort_keys
+from utils.physics import get_h_indices, get_h_mask
 
 # Transformation matrices
 transformations = [np.array([[0, -1],  # 90 degrees
-                             [1, 0]]),
+                             [1, 0]], dtype=COORD_DTYPE),
                    np.array([[-1, 0],  # 180 degrees
-                             [0, -1]]),
+                             [0, -1]], dtype=COORD_DTYPE),
                    np.array([[0, 1],  # 270 degrees
-                             [-1, 0]]),
+                             [-1, 0]], dtype=COORD_DTYPE),
                    np.array([[1, 0],  # reflect X
-                             [0, -1]]),
+                             [0, -1]], dtype=COORD_DTYPE),
                    np.array([[-1, 0],  # reflect Y
-                             [0, 1]]),
+                             [0, 1]], dtype=COORD_DTYPE),
                    np.array([[0, 1],  # reflect Y = X
-                             [1, 0]]),
+                             [1, 0]], dtype=COORD_DTYPE),
                    np.array([[0, -1],  # reflect Y = -X
-                             [-1, 0]])]
+                             [-1, 0]], dtype=COORD_DTYPE)]
+TRANSFORMATIONS = np.stack(transformations) # (7, 2, 2) for applying all of them at once
+
+# Vectorized moves and chain growth draw from NumPy
+rng = np.random.default_rng()
+
+def reseed(seed):
+    # Reseed the shared generator IN PLACE, so every module that did `from utils.initialization import rng` follows.
+    # Worker processes use this to get their own independent stream (seed = one SeedSequence.spawn child).
+    rng.bit_generator.state = np.random.default_rng(seed).bit_generator.state
+
+def get_rng(generator: np.random.Generator = None):
+    # The generator to draw from: the one given (e.g. a bulk job's own stream), else the shared one.
+    # Functions that take an rng start with `rng = get_rng(rng)`, so without one they behave as before.
+    return rng if generator is None else generator
 
 # Can create a new polymer of length n
 def madras_sokal_init(length: int):
     # Initialize starting polymer (line)
-    coords = np.zeros((length, 2))
+    coords = np.zeros((length, 2), dtype=COORD_DTYPE)
     coords[:, 1] = np.arange(length)
 
     # Mutate length times
@@ -74,61 +90,411 @@ def ms_mutate_OLD(coords: np.ndarray):
 
 
 def ms_mutate(coords: np.ndarray):
+    move = pivot_move(coords)
+
+    # No valid pivot anywhere on the chain: leave it as is
+    if move is not None:
+        tail, new_tail = move
+        coords[tail, :] = new_tail
+
+    return coords
+
+def get_tail(length: int, piv_idx: int):
+    # Always move the shorter tail (less drastic changes)
+    if piv_idx >= length // 2:
+        return slice(piv_idx + 1, length)
+
+    return slice(0, piv_idx)
+
+def pivot_candidates(coords: np.ndarray, pivots: np.ndarray, allow_identity: bool = True, occupancy: Occupancy = None):
+    # Applies ALL transformations at every pivot in one go: returns (pivots, transformations, N, 2) transformed
+    # conformations (only the tail side of each pivot is meaningful) and a (pivots, transformations) mask of
+    # the ones that are self-avoiding
     length = coords.shape[0]
-    midpoint = length // 2
+    indices = np.arange(length)
 
-    overlap = True
-    while overlap:
-        # Randomly choose hinge
-        piv_idx = random.randint(1, length - 2) # Exclude first and last entries for pivot
-        pivot_coord = coords[piv_idx, :]
+    if occupancy is None:
+        occupancy = Occupancy(coords, padding=int(np.ptp(coords, axis=0).max()))
 
-        # Choose shorter tail (less drastic changes)
-        if piv_idx >= midpoint:
-            tail = coords[(piv_idx+1):, :]
-            remaining_body = coords[:(piv_idx+1), :]
-        else:
-            tail = coords[:piv_idx, :]
-            remaining_body = coords[piv_idx:, :]
+    # Shorter tail: after the pivot (+1) or before it (-1). Signed distance from the pivot is > 0 on the tail.
+    side = np.where(pivots >= length // 2, 1, -1)[:, None]
+    in_tail = (indices[None, :] - pivots[:, None]) * side > 0 # (pivots, N)
 
-        # Make random transformation
-        transformation = random.choice(transformations)
+    # Transform every bead around every pivot
+    pivot_coords = coords[pivots][:, None, None, :]
+    transformed = ((coords[None, None, :, :] - pivot_coords) @ TRANSFORMATIONS[None, :, :, :]) + pivot_coords
 
-        # Transform tail, pivoting around pivot coordinate (NOT 0, 0)
-        new_tail = ((tail - pivot_coord) @ transformation) + pivot_coord
+    # A transformed tail bead collides if it lands on a bead that stays put (the old tail sites are free to reuse)
+    hit = occupancy.lookup(transformed) # (pivots, transformations, N)
+    hit_body = (hit >= 0) & ((hit - pivots[:, None, None]) * side[:, :, None] <= 0)
+    valid = ~np.any(hit_body & in_tail[:, None, :], axis=2)
 
-        # Check overlap between new tail and body
-        overlap = np.any(np.all(new_tail[:, None, :] == remaining_body[None, :, :], axis=2))
+    # Some reflections can map a tail onto itself, which is not really a move
+    if not allow_identity:
+        moved = np.any(transformed != coords[None, None, :, :], axis=3)
+        valid &= np.any(moved & in_tail[:, None, :], axis=2)
 
-        if not overlap:
-            if piv_idx >= midpoint:
-                coords[(piv_idx+1):, :] = new_tail
-            else:
-                coords[:piv_idx, :] = new_tail
+    return transformed, valid
 
-    return coords
+def pivot_move(coords: np.ndarray, batch_size: int = 1, allow_identity: bool = True,
+               rng: np.random.Generator = None):
+    # Finds a valid pivot move WITHOUT applying it: returns the moved tail (slice) and its new coordinates,
+    # or None if no pivot/transformation pair on the whole chain is self-avoiding
+    rng = get_rng(rng)
+    length = coords.shape[0]
 
-def one_ms_mutate(coords: np.ndarray, max_att: int = 100):
-    cur_coords = coords.copy()
-    attempts = 0
+    # Randomly ordered hinges, excluding first and last entries. Each batch of hinges is checked against every
+    # transformation at once and a move is drawn uniformly from the valid ones, so there are no blind retries.
+    pivots = rng.permutation(np.arange(1, length - 1))
 
-    while np.array_equal(cur_coords, coords):
-        ms_mutate(coords)
+    occupancy = Occupancy(coords, padding=int(np.ptp(coords, axis=0).max())) # a pivot never moves a bead further
+    for start in range(0, len(pivots), batch_size):
+        batch = pivots[start:(start + batch_size)]
+        candidates, valid = pivot_candidates(coords, batch, allow_identity, occupancy)
 
-        attempts += 1
-        if attempts >= max_att:
-            print(f"Warning: Could not find valid mutation after {max_att} attempts.")
+        valid_moves = np.argwhere(valid)
+        if len(valid_moves) > 0:
+            piv_num, trans_num = valid_moves[rng.integers(len(valid_moves))]
+            tail = get_tail(length, batch[piv_num])
+
+            return tail, candidates[piv_num, trans_num, tail, :]
+
+    return None
+
+def pivot_move_batch(coords_batch: np.ndarray, max_rounds: int = 8, rng: np.random.Generator = None):
+    # One pivot move on EVERY conformation of a (B, N, 2) batch, in place. Each round draws one hinge per chain
+    # and tries all transformations on all chains at once; chains whose hinge had no valid move go again.
+    # Returns a (B,) mask of the chains that actually moved.
+    rng = get_rng(rng)
+    num_chains, length = coords_batch.shape[:2]
+    moved = np.zeros(num_chains, dtype=bool)
+    todo = np.arange(num_chains)
+
+    if length < 3:
+        return moved
+
+    for _ in range(max_rounds):
+        if len(todo) == 0:
             break
 
+        pivots = rng.integers(1, length - 1, size=len(todo))
+        candidates, valid = pivot_candidates_batch(coords_batch[todo], pivots)
+
+        # Uniform among each chain's valid transformations (random keys, invalid ones zeroed out)
+        has_move = valid.any(axis=1)
+        picks = np.argmax(rng.random(valid.shape) * valid, axis=1)
+
+        done = todo[has_move]
+        coords_batch[done] = candidates[has_move, picks[has_move]]
+        moved[done] = True
+        todo = todo[~has_move]
+
+    # Leftovers are very compact folds: search every hinge of each (this also finds folds with no move at all)
+    for idx in todo:
+        move = pivot_move(coords_batch[idx], rng=rng)
+
+        if move is not None:
+            tail, new_tail = move
+            coords_batch[idx, tail, :] = new_tail
+            moved[idx] = True
+
+    return moved
+
+def pivot_candidates_batch(coords_batch: np.ndarray, pivots: np.ndarray):
+    # One hinge per chain, ALL transformations: returns (B, transformations, N, 2) candidate conformations
+    # and a (B, transformations) self-avoidance mask
+    length = coords_batch.shape[1]
+    indices = np.arange(length)
+
+    side = np.where(pivots >= length // 2, 1, -1)[:, None]
+    in_tail = (indices[None, :] - pivots[:, None]) * side > 0 # (B, N)
+
+    pivot_coords = coords_batch[np.arange(len(pivots)), pivots][:, None, None, :]
+    transformed = ((coords_batch[:, None, :, :] - pivot_coords) @ TRANSFORMATIONS[None, :, :, :]) + pivot_coords
+    candidates = np.where(in_tail[:, None, :, None], transformed, coords_batch[:, None, :, :])
+
+    # Self-avoiding = no repeated lattice key. Transformed beads stay within N - 1 sites of their pivot.
+    origin = coords_batch.min(axis=1).astype(np.int64)[:, None, None, :] - length
+    sorted_keys = np.sort(pack_keys(candidates, origin, 4 * length), axis=2)
+    valid = ~np.any(sorted_keys[..., 1:] == sorted_keys[..., :-1], axis=2)
+
+    return candidates, valid
+
+def one_ms_mutate(coords: np.ndarray):
+    # Guaranteed visible mutation (no identity moves), if the fold has any valid move at all
+    move = pivot_move(coords, allow_identity=False)
+
+    if move is None:
+        print("Warning: No valid mutation exists for this fold.")
+    else:
+        tail, new_tail = move
+        coords[tail, :] = new_tail
+
     return coords
 
 
+# LOCAL MOVES (compact folds, where almost every pivot collides)
+# Like pivot_move, every move is only proposed: it returns the moved beads (slice) and their new coordinates,
+# or None if the drawn move is impossible. The bead (and direction) is random unless given.
+def is_free(occupancy: Occupancy, sites: np.ndarray):
+    # True where no bead sits on the site(s) (..., 2). Every site a local move tries is within one site of the
+    # fold's bounding box, so one Occupancy(coords) per move answers all of them.
+    return ~occupancy.is_occupied(sites)
+
+def is_adjacent(a: np.ndarray, b: np.ndarray):
+    return np.abs(a - b).sum() == 1
+
+def end_move(coords: np.ndarray, end: int = None, rng: np.random.Generator = None):
+    # An end bead jumps to a free site next to its only bonded neighbour
+    rng = get_rng(rng)
+    if end is None:
+        end = 0 if rng.random() < 0.5 else coords.shape[0] - 1
+
+    neighbor = coords[1] if end == 0 else coords[-2]
+    sites = neighbor + STEPS
+    sites = sites[is_free(Occupancy(coords), sites)]
+
+    if len(sites) == 0:
+        return None
+
+    return slice(end, end + 1), sites[rng.integers(len(sites))][None, :]
+
+def corner_move(coords: np.ndarray, idx: int = None, rng: np.random.Generator = None):
+    # A bead on a corner (its bonded neighbours are diagonal) flips to the opposite corner of the square
+    rng = get_rng(rng)
+    if idx is None:
+        idx = int(rng.integers(1, coords.shape[0] - 1))
+
+    prev_bead, next_bead = coords[idx - 1], coords[idx + 1]
+    if np.any(prev_bead == next_bead): # straight, not a corner
+        return None
+
+    site = prev_bead + next_bead - coords[idx]
+    if not is_free(Occupancy(coords), site):
+        return None
+
+    return slice(idx, idx + 1), site[None, :]
+
+def crankshaft_move(coords: np.ndarray, idx: int = None, rng: np.random.Generator = None):
+    # Beads idx, idx + 1 form a U with idx - 1, idx + 2 (which touch): flip the U to the other side
+    rng = get_rng(rng)
+    if coords.shape[0] < 4: # no room for a U
+        return None
+
+    if idx is None:
+        idx = int(rng.integers(1, coords.shape[0] - 2))
+
+    if not is_adjacent(coords[idx - 1], coords[idx + 2]):
+        return None
+
+    shift = coords[idx - 1] - coords[idx] # the U sticks out by -shift, so the flipped U sits at +shift
+    new_moved = coords[idx:idx + 2] + 2 * shift
+    if not np.all(is_free(Occupancy(coords), new_moved)):
+        return None
+
+    return slice(idx, idx + 2), new_moved
+
+def pull_move(coords: np.ndarray, idx: int = None, direction: int = None, rng: np.random.Generator = None):
+    # Pull move (Lesh et al. 2003): bead idx moves to a free site L next to its bonded neighbour on the anchor side
+    # (diagonal to idx). The next bead away from the anchor moves to C, the fourth corner of that square, and the
+    # rest of the chain on that side follows two sites behind until it is connected again.
+    rng = get_rng(rng)
+    length = coords.shape[0]
+    if direction is None:
+        direction = -1 if rng.random() < 0.5 else 1
+
+    # Walk the chain so that the anchor is at i + 1 and the pulled beads are i, i - 1, ..., 0
+    chain = coords if direction == -1 else coords[::-1]
+    i = int(rng.integers(0, length - 1)) if idx is None else (idx if direction == -1 else length - 1 - idx)
+    anchor = chain[i + 1]
+
+    bond = chain[i] - anchor # L = anchor + side, C = chain[i] + side (an end bead only needs L)
+    occupancy = Occupancy(coords)
+    sides = [side for side in (bond[::-1], -bond[::-1]) # both perpendicular directions
+             if is_free(occupancy, anchor + side)
+             and (i == 0 or np.array_equal(chain[i] + side, chain[i - 1]) or is_free(occupancy, chain[i] + side))]
+
+    if len(sides) == 0:
+        return None
+
+    side = sides[rng.integers(len(sides))]
+    new_chain = chain[:i + 1].copy()
+    new_chain[i] = anchor + side
+
+    # Beads that are still connected stay put
+    first = i
+    if i > 0 and not np.array_equal(chain[i] + side, chain[i - 1]):
+        new_chain[i - 1] = chain[i] + side
+        first = i - 1
+
+        while first > 0 and not is_adjacent(chain[first - 1], new_chain[first]):
+            first -= 1
+            new_chain[first] = chain[first + 2]
+
+    if direction == -1:
+        return slice(first, i + 1), new_chain[first:i + 1]
+
+    return slice(length - 1 - i, length - first), new_chain[first:i + 1][::-1]
+
+# Move types a move mix can draw from. Rigid moves keep the moved beads' contacts with each other.
+MOVES = {"pivot": lambda coords, rng=None: pivot_move(coords, allow_identity=False, rng=rng),
+         "end": end_move,
+         "corner": corner_move,
+         "crankshaft": crankshaft_move,
+         "pull": pull_move}
+RIGID_MOVES = {"pivot", "end", "corner", "crankshaft"}
+
+# Half pivots for big rearrangements, half local moves to fine tune compact folds
+DEFAULT_MOVE_MIX = {"pivot": 0.5, "end": 0.05, "corner": 0.15, "crankshaft": 0.1, "pull": 0.2}
+
+def pivot_mix(pivot_share: float):
+    # pivot_share of the moves are pivots, the local moves split the rest in their default proportions
+    local_mix = {move_type: weight for move_type, weight in DEFAULT_MOVE_MIX.items() if move_type != "pivot"}
+    scale = (1 - pivot_share) / sum(local_mix.values())
+
+    return {"pivot": pivot_share} | {move_type: weight * scale for move_type, weight in local_mix.items()}
+
+class MoveStats:
+    # Per move type: how often it was tried, how often it was possible at all, and how often it was accepted
+    # (a GA applies every possible mutation, selection judges them afterwards)
+    def __init__(self):
+        self.tried = {}
+        self.valid = {}
+        self.accepted = {}
+
+    def record(self, move_type: str, valid: bool, accepted: bool, tried: int = 1):
+        # One move, or `tried` moves with valid / accepted as counts
+        self.tried[move_type] = self.tried.get(move_type, 0) + tried
+        self.valid[move_type] = self.valid.get(move_type, 0) + int(valid)
+        self.accepted[move_type] = self.accepted.get(move_type, 0) + int(accepted)
+
+    def merge(self, other):
+        for move_type in other.tried:
+            self.tried[move_type] = self.tried.get(move_type, 0) + other.tried[move_type]
+            self.valid[move_type] = self.valid.get(move_type, 0) + other.valid[move_type]
+            self.accepted[move_type] = self.accepted.get(move_type, 0) + other.accepted[move_type]
+
+        return self
+
+    def rates(self):
+        # Acceptance rate per move type (accepted / tried)
+        return {move_type: self.accepted[move_type] / self.tried[move_type] for move_type in self.tried}
+
+def draw_move_type(move_mix: dict, rng: np.random.Generator = None):
+    # move_mix: {move type: relative weight}
+    rng = get_rng(rng)
+    move_types = list(move_mix)
+    weights = np.array([move_mix[move_type] for move_type in move_types], dtype=float)
+
+    return move_types[rng.choice(len(move_types), p=weights / weights.sum())]
+
+def random_move(coords: np.ndarray, move_mix: dict, rng: np.random.Generator = None):
+    # Draws a move type from the mix and proposes one move of that type: returns (move type, move or None)
+    rng = get_rng(rng)
+    move_type = draw_move_type(move_mix, rng)
+
+    return move_type, MOVES[move_type](coords, rng=rng)
+
+def random_move_batch(coords_batch: np.ndarray, move_mix: dict, rng: np.random.Generator = None,
+                      move_stats: MoveStats = None):
+    # One move on EVERY conformation of a (B, N, 2) batch, in place, each chain drawing its move type from the mix:
+    # the pivot chains go through pivot_move_batch together, the local moves (cheap anyway) one chain at a time.
+    # Returns a (B,) mask of the chains that actually moved (also counted per move type in move_stats, if given).
+    rng = get_rng(rng)
+    move_types = list(move_mix)
+    weights = np.array([move_mix[move_type] for move_type in move_types], dtype=float)
+    drawn = rng.choice(len(move_types), size=coords_batch.shape[0], p=weights / weights.sum())
+    moved = np.zeros(coords_batch.shape[0], dtype=bool)
+
+    for type_num, move_type in enumerate(move_types):
+        chains = np.flatnonzero(drawn == type_num)
+        if len(chains) == 0:
+            continue
+
+        if move_type == "pivot" and len(chains) == len(coords_batch): # pivot-only mix: no copy of the batch
+            moved = pivot_move_batch(coords_batch, rng=rng)
+        elif move_type == "pivot":
+            pivot_coords = coords_batch[chains]
+            moved[chains] = pivot_move_batch(pivot_coords, rng=rng)
+            coords_batch[chains] = pivot_coords
+        else:
+            for idx in chains:
+                move = MOVES[move_type](coords_batch[idx], rng=rng)
+
+                if move is not None:
+                    moved_beads, new_moved = move
+                    coords_batch[idx, moved_beads, :] = new_moved
+                    moved[idx] = True
+
+        if move_stats is not None:
+            num_moved = int(np.count_nonzero(moved[chains]))
+            move_stats.record(move_type, valid=num_moved, accepted=num_moved, tried=len(chains))
+
+    return moved
+
+def hill_climb_batch(coords_batch: np.ndarray, energies: np.ndarray, names: np.ndarray, num_steps: int = 10,
+                     rng: np.random.Generator = None):
+    # Greedy local search on EVERY conformation of a (B, N, 2) batch at once, in place (energies too).
+    # Each step proposes one cheap single-bead move per chain (end move at the ends, corner flip elsewhere)
+    # on a random H bead, since moving a P bead never changes the score, and keeps it only if it gains contacts.
+    # Moves are scored incrementally: H neighbours of the new site minus H neighbours of the old site.
+    rng = get_rng(rng)
+    num_chains, length = coords_batch.shape[:2]
+    h_mask = get_h_mask(names)
+    h_indices = get_h_indices(names)
+
+    if len(h_indices) == 0 or length < 3:
+        return energies
+
+    chains = np.arange(num_chains)
+    stride = length + 4 # new sites stay within one site of the chain's bounding box
+    block = chains.astype(np.int64)[:, None] * stride**2
+    offsets = (STEPS[:, 0].astype(np.int64) * stride + STEPS[:, 1])[None, :]
+
+    for _ in range(num_steps):
+        beads = h_indices[rng.integers(len(h_indices), size=num_chains)]
+        old_sites = coords_batch[chains, beads]
+
+        # End beads step around their neighbour, the others flip across the corner (straight beads can't)
+        prev_sites = coords_batch[chains, np.maximum(beads - 1, 0)]
+        next_sites = coords_batch[chains, np.minimum(beads + 1, length - 1)]
+        new_sites = prev_sites + next_sites - old_sites
+        possible = np.all(prev_sites != next_sites, axis=1)
+
+        ends = (beads == 0) | (beads == length - 1)
+        anchors = np.where((beads == 0)[:, None], next_sites, prev_sites)
+        new_sites[ends] = anchors[ends] + STEPS[rng.integers(4, size=np.count_nonzero(ends))]
+        possible[ends] = True
+
+        # One key table for the whole batch (each chain in its own block of keys)
+        origin = coords_batch.min(axis=1, keepdims=True).astype(np.int64) - 2
+        table_keys = (pack_keys(coords_batch, origin, stride) + block).ravel()
+        sorted_keys, sorted_indices = sort_keys(table_keys, np.tile(np.arange(length), num_chains))
+
+        new_keys = pack_keys(new_sites[:, None, :], origin, stride)[:, 0] + block[:, 0]
+        old_keys = pack_keys(old_sites[:, None, :], origin, stride)[:, 0] + block[:, 0]
+        possible &= search_keys(sorted_keys, sorted_indices, new_keys) < 0
+
+        # H neighbours that are not bonded to the moving bead (and not the bead itself, around its new site)
+        def h_contacts(keys):
+            partners = search_keys(sorted_keys, sorted_indices, keys[:, None] + offsets)
+            counted = (partners >= 0) & (np.abs(partners - beads[:, None]) > 1) & h_mask[np.maximum(partners, 0)]
+            return np.count_nonzero(counted, axis=1)
+
+        delta = h_contacts(new_keys) - h_contacts(old_keys)
+        improved = possible & (delta > 0)
+
+        coords_batch[chains[improved], beads[improved]] = new_sites[improved]
+        energies[improved] += delta[improved]
+
+    return energies
+
 # The myopic random walk fails & gets stuck for large n >= roughly 50. (certify this number by doing monte carlo methods)
 # Therefore, we can try to use Markov Chain Monte Carlo by assuming a straight line,
 # then doing 10N pivot mutations to get diversity. This number of 10N pivots
 def myopic_init(length: int):
     dir_arr = np.zeros(length - 1)
-    position_matrix = np.zeros((length, 2))
+    position_matrix = np.zeros((length, 2), dtype=COORD_DTYPE)
     position_matrix[0, :] = (0, 0)
 
     for index, step in enumerate(dir_arr):
@@ -146,8 +512,89 @@ def myopic_init(length: int):
 
     return dir_arr, position_matrix, names
 
-def rosenbluth_init(length: int):
-    pass
+def rosenbluth_init(length: int, num_polymers: int = 1, names: np.ndarray = None, bias: float = 0.0,
+                    prune_ratio: float = 0.5, enrich_ratio: float = 2.0, rng: np.random.Generator = None):
+    # Pruned-enriched Rosenbluth method (PERM): grows a whole batch of self-avoiding walks side by side, bead by bead.
+    # Each new bead picks one of its free neighbour sites, with weight exp(bias * new H-H contacts) so bias > 0
+    # steers the walks towards compact folds. Every walk carries a Rosenbluth weight that corrects for those choices;
+    # low weight walks are pruned, high weight walks are cloned (enriched) and trapped walks die, so nothing restarts.
+    # Returns (num_polymers, length, 2) coordinates.
+    rng = get_rng(rng)
+    is_h = (names == 'H') if names is not None else np.zeros(length, dtype=bool)
+
+    # Grow twice as many walks as needed, so enough distinct ones are left after enrichment cloning
+    num_walks = 2 * num_polymers
+
+    while True:
+        coords = np.zeros((num_walks, length, 2), dtype=COORD_DTYPE)
+        coords[:, :, 1] = np.minimum(np.arange(length), 1) # first bond always points up (rotations don't matter)
+        log_weights = np.zeros(num_walks)
+
+        for bead in range(2, length):
+            sites = coords[:, bead - 1, None, :] + STEPS[None, :, :] # (walks, 4, 2)
+            dists = np.abs(sites[:, :, None, :] - coords[:, None, :bead, :]).sum(axis=3) # (walks, 4, placed)
+
+            free = ~np.any(dists == 0, axis=2)
+            if is_h[bead]:
+                # New non-bonded contacts: H beads (other than the previous bead) right next to the site
+                contacts = np.count_nonzero((dists[:, :, :(bead - 1)] == 1) & is_h[None, None, :(bead - 1)], axis=2)
+            else:
+                contacts = np.zeros(free.shape)
+
+            site_weights = free * np.exp(bias * contacts)
+            totals = site_weights.sum(axis=1)
+
+            # Trapped walks (no free site) die
+            alive = totals > 0
+            if not np.any(alive):
+                break
+            coords, log_weights = coords[alive], log_weights[alive] + np.log(totals[alive])
+            sites, site_weights, totals = sites[alive], site_weights[alive], totals[alive]
+
+            # Pick one site per walk, proportional to its weight
+            roll = rng.random(len(totals)) * totals
+            picks = np.argmax(np.cumsum(site_weights, axis=1) > roll[:, None], axis=1)
+            coords[:, bead, :] = sites[np.arange(len(picks)), picks, :]
+
+            coords, log_weights = prune_and_enrich(coords, log_weights, num_walks, prune_ratio, enrich_ratio, rng)
+        else:
+            # Every walk reached full length: drop repeated clones, then draw the batch by Rosenbluth weight
+            _, distinct = np.unique(coords.reshape(len(coords), -1), axis=0, return_index=True)
+            coords, log_weights = coords[distinct], log_weights[distinct]
+
+            probs = np.exp(log_weights - log_weights.max())
+            picks = rng.choice(len(coords), size=num_polymers, replace=(len(coords) < num_polymers), p=probs / probs.sum())
+
+            return coords[picks]
+
+def prune_and_enrich(coords: np.ndarray, log_weights: np.ndarray, target: int,
+                     prune_ratio: float = 0.5, enrich_ratio: float = 2.0, rng: np.random.Generator = None):
+    # PERM population control relative to the mean weight at this length
+    rng = get_rng(rng)
+    ratio = np.exp(log_weights - log_weights.max())
+    ratio /= ratio.mean()
+
+    # Below prune_ratio: killed half the time, survivors carry double weight
+    low = ratio < prune_ratio
+    survives = ~low | (rng.random(len(ratio)) < 0.5)
+    log_weights = log_weights + np.log(2) * low
+
+    # Above enrich_ratio: split into two copies carrying half the weight each
+    high = ratio > enrich_ratio
+    log_weights = log_weights - np.log(2) * high
+
+    copies = np.where(high, 2, 1) * survives
+    coords, log_weights = np.repeat(coords, copies, axis=0), np.repeat(log_weights, copies)
+
+    # Keep the batch near its target size by resampling on the weights
+    if len(coords) > 2 * target or len(coords) < target // 2:
+        probs = np.exp(log_weights - log_weights.max())
+        picks = rng.choice(len(coords), size=target, p=probs / probs.sum())
+        mean_log_weight = log_weights.max() + np.log(probs.mean())
+
+        coords, log_weights = coords[picks], np.full(target, mean_log_weight)
+
+    return coords, log_weights
 
 def mutate_step(pos: np.ndarray, step: int, row: int):
     if step == 0:
@@ -159,7 +606,5 @@ def mutate_step(pos: np.ndarray, step: int, row: int):
     else:
         pos[row + 1, :] = pos[row, :] + (-1, 0)
 
-    if (len(np.unique(pos, axis = 0)) != row + 2): # If there aren't n unique coordinates, collision is True
-        return True
-
-    return False
\ No newline at end of file
+    # Collision if the new bead lands on any bead already placed
+    return bool(overlaps(pos[row + 1, :], pos[:(row + 1), :]))
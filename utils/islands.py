@@ -0,0 +1,146 @@
+import multiprocessing
+
+import numpy as np
+
+from core.run_state import merge_death_log, merge_move_stats, update_selection_differential
+from population import Population
+from sequence import Sequence
+from utils.genetics import increase_generation
+from utils.initialization import MoveStats, reseed
+from utils.lattice import decode_genome
+
+
+class Archipelago:
+    # Island model: K sub-populations, each evolved by its own process with the usual select/age/reproduce cycle.
+    # Every migration_interval generations the best num_migrants folds of each island replace the worst folds
+    # of the next island along a ring. After every generation the islands send back a packed snapshot, so
+    # `population` is always the whole archipelago as one Population (for plots, stats and records).
+    def __init__(self, sequence: Sequence, num_islands: int, island_size: int, tourney_size: int,
+                 migration_interval: int = 10, num_migrants: int = 2, seed: int = None, state = None,
+                 memetic_steps: int = 0, memetic_top_k: int = None, move_mix: dict = None):
+        if island_size % 2 == 1:
+            raise ValueError(f"Error: Island size {island_size} must be an even integer.")
+        if num_migrants >= island_size // 2:
+            raise ValueError(f"Error: {num_migrants} migrants is too many for islands of {island_size}.")
+
+        self.sequence = sequence
+        self.migration_interval = migration_interval
+        self.num_migrants = num_migrants
+        self.state = state # where the merged death logs and selection differential go (None = not recorded)
+        self.generation = 0
+
+        # One pipe and one independent RNG stream per island
+        self.connections = []
+        self.processes = []
+        for island_seed in np.random.SeedSequence(seed).spawn(num_islands):
+            connection, island_connection = multiprocessing.Pipe()
+            args = (island_connection, sequence, island_size, tourney_size, island_seed, memetic_steps, memetic_top_k,
+                    move_mix)
+            process = multiprocessing.Process(target=run_island, args=args, daemon=True)
+            process.start()
+
+            self.connections.append(connection)
+            self.processes.append(process)
+
+        self.snapshots = [connection.recv() for connection in self.connections]
+        self.population = self.combine()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def step(self):
+        # One generation on every island at once (plus migration when it is due), returns the combined population
+        self.generation += 1
+        migrants = self.emigrants() if self.generation % self.migration_interval == 0 else [None] * len(self.connections)
+
+        for connection, island_migrants in zip(self.connections, migrants):
+            connection.send(("step", island_migrants))
+        self.snapshots = [connection.recv() for connection in self.connections]
+
+        # Death logs and move statistics add up, the selection differential is averaged over the islands
+        for snapshot in self.snapshots:
+            merge_death_log(snapshot['age_deaths'], session_state='age_deaths', state=self.state)
+            merge_death_log(snapshot['fitness_deaths'], session_state='fitness_deaths', state=self.state)
+            merge_move_stats(snapshot['move_stats'], state=self.state)
+        update_selection_differential(np.mean([snapshot['selection_differential'] for snapshot in self.snapshots]),
+                                      state=self.state)
+
+        self.population = self.combine()
+
+        return self.population
+
+    def emigrants(self):
+        # Ring migration: island i receives the best folds of island i - 1
+        best = []
+        for snapshot in self.snapshots:
+            top = np.argsort(snapshot['energies'])[-self.num_migrants:]
+            best.append((snapshot['genomes'][top], snapshot['energies'][top]))
+
+        return best[-1:] + best[:-1]
+
+    def combine(self):
+        snapshots = self.snapshots
+        population = Population.from_genomes(self.sequence,
+                                             np.concatenate([snapshot['genomes'] for snapshot in snapshots]),
+                                             np.concatenate([snapshot['energies'] for snapshot in snapshots]),
+                                             np.concatenate([snapshot['ages'] for snapshot in snapshots]),
+                                             np.concatenate([snapshot['mega'] for snapshot in snapshots]))
+
+        return population
+
+    def close(self):
+        for connection, process in zip(self.connections, self.processes):
+            if process.is_alive():
+                connection.send(("stop", None))
+            process.join()
+            connection.close()
+
+        self.processes = []
+        self.connections = []
+
+def run_island(connection, sequence: Sequence, island_size: int, tourney_size: int, seed,
+               memetic_steps: int = 0, memetic_top_k: int = None, move_mix: dict = None):
+    # Runs in the island's process: keeps its Population between generations and only answers with snapshots
+    reseed(seed)
+    population = Population.random(sequence, island_size)
+    log = new_island_log()
+    connection.send(island_snapshot(population, log))
+
+    while True:
+        command, migrants = connection.recv()
+        if command == "stop":
+            break
+
+        if migrants is not None:
+            immigrate(population, *migrants)
+
+        log = new_island_log()
+        population = increase_generation(population, tourney_size, state=log,
+                                         memetic_steps=memetic_steps, memetic_top_k=memetic_top_k, move_mix=move_mix)
+        connection.send(island_snapshot(population, log))
+
+    connection.close()
+
+def immigrate(population: Population, genomes: np.ndarray, energies: np.ndarray):
+    # Migrants replace the worst members (and start at age 0 like any newcomer)
+    survivors = np.sort(np.argsort(population.energies)[len(genomes):])
+    population.keep(survivors)
+    population.append(decode_genome(genomes, population.sequence.length), energies)
+
+def new_island_log():
+    return {'age_deaths': {}, 'fitness_deaths': {}, 'selection_differential': [], 'move_stats': MoveStats()}
+
+def island_snapshot(population: Population, log: dict):
+    snapshot = {'genomes': population.genomes(),
+                'energies': population.energies.copy(),
+                'ages': population.ages.copy(),
+                'mega': population.mega.copy(),
+                'age_deaths': log['age_deaths'],
+                'fitness_deaths': log['fitness_deaths'],
+                'move_stats': log['move_stats'],
+                'selection_differential': np.mean(log['selection_differential']) if log['selection_differential'] else 0.0}
+
+    return snapshot
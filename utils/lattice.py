@@ -0,0 +1,192 @@
+import numpy as np
+
+# Lattice coordinates are small integers
+COORD_DTYPE = np.int16
+
+# Lattice steps (N, E, S, W): turning right moves one step forward in this list
+STEPS = np.array([(0, 1), (1, 0), (0, -1), (-1, 0)], dtype=COORD_DTYPE)
+
+# (dx, dy) offsets of the lattice neighbours around a bead
+NEIGHBORHOODS = {
+    "vn": np.array([(-1, 0), (0, -1), (0, 1), (1, 0)]),
+    "moore": np.array([(-1, -1), (-1, 0), (-1, 1), (0, -1),
+                       (0, 1), (1, -1), (1, 0), (1, 1)])
+}
+
+def get_neighborhood(n_hood: str = "vn"):
+    if n_hood not in NEIGHBORHOODS:
+        raise ValueError(f"Invalid neighbor type: '{n_hood}'. Please choose 'vn' or 'moore'.")
+
+    return NEIGHBORHOODS[n_hood]
+
+def pack_keys(coords: np.ndarray, origin: np.ndarray, stride: int):
+    # Packs integer lattice points (..., 2) into ONE scalar key each: key = (x - x0) * stride + (y - y0)
+    # origin must sit at least 1 below every point and stride must be 2 more than the widest extent,
+    # so that probing key +/- stride +/- 1 never wraps onto another row.
+    shifted = coords.astype(np.int64) - origin
+
+    return shifted[..., 0] * stride + shifted[..., 1]
+
+def pack_offsets(offsets: np.ndarray, stride: int):
+    # Same packing for neighbour offsets, so neighbour keys are just key + packed offset
+    return offsets[:, 0].astype(np.int64) * stride + offsets[:, 1]
+
+def count_key_hits(query_keys: np.ndarray, query_indices: np.ndarray,
+                   table_keys: np.ndarray, table_indices: np.ndarray, packed_offsets: np.ndarray):
+    # For each query bead, how many table beads sit on one of its neighbour sites (ignoring backbone pairs)
+    sorted_keys, sorted_indices = sort_keys(table_keys, table_indices)
+
+    probes = query_keys[:, None] + packed_offsets[None, :] # (Q, neighbours)
+    partners = search_keys(sorted_keys, sorted_indices, probes)
+    is_not_backbone = np.abs(query_indices[:, None] - partners) > 1
+
+    return np.count_nonzero((partners >= 0) & is_not_backbone, axis=1)
+
+def sort_keys(keys: np.ndarray, indices: np.ndarray):
+    # Sorted key table (and the bead index behind each key) for repeated lookups
+    order = np.argsort(keys)
+
+    return keys[order], indices[order]
+
+def search_keys(sorted_keys: np.ndarray, sorted_indices: np.ndarray, probes: np.ndarray):
+    # Bead index sitting on each probe key, -1 where nobody is there
+    if len(sorted_keys) == 0:
+        return np.full(probes.shape, -1)
+
+    pos = np.searchsorted(sorted_keys, probes)
+    pos[pos == len(sorted_keys)] = 0 # out of range probes can't match anyway, just keep the lookup valid
+
+    return np.where(sorted_keys[pos] == probes, sorted_indices[pos], -1)
+
+
+class Occupancy:
+    # Grid of which bead occupies which lattice site, built ONCE per conformation and reused for every
+    # self-avoidance check against it (pivot candidates, growth steps, local moves...) instead of comparing
+    # coordinates pairwise. Lookups must stay within `padding` sites of the bounding box of the beads and of the
+    # `cover` points (e.g. where moved beads are going).
+    def __init__(self, coords: np.ndarray, padding: int = 1, indices: np.ndarray = None, cover: np.ndarray = None):
+        if indices is None:
+            indices = np.arange(coords.shape[0])
+
+        bounds = coords if cover is None else np.concatenate([coords, cover])
+        self.origin = bounds.min(axis=0).astype(np.int64) - padding
+        shape = bounds.max(axis=0).astype(np.int64) - self.origin + padding + 1
+
+        self.grid = np.full(shape, -1, dtype=np.int32)
+        shifted = coords - self.origin
+        self.grid[shifted[:, 0], shifted[:, 1]] = indices
+
+    def lookup(self, points: np.ndarray):
+        # Index of the bead on each point (..., 2), or -1 if that site is free
+        shifted = points - self.origin
+
+        return self.grid[shifted[..., 0], shifted[..., 1]]
+
+    def is_occupied(self, points: np.ndarray):
+        return self.lookup(points) >= 0
+
+    def move(self, old_points: np.ndarray, new_points: np.ndarray, indices: np.ndarray):
+        # Keeps the grid up to date after beads moved (old points first, so beads may move onto each other's sites)
+        old_shifted, new_shifted = old_points - self.origin, new_points - self.origin
+        self.grid[old_shifted[:, 0], old_shifted[:, 1]] = -1
+        self.grid[new_shifted[:, 0], new_shifted[:, 1]] = indices
+
+    def reaches(self, points: np.ndarray, margin: int = 0):
+        # True if lookups up to `margin` sites away from every point (..., 2) stay inside the grid
+        shifted = (points - self.origin).reshape(-1, 2)
+
+        return shifted.min() >= margin and np.all(shifted.max(axis=0) < np.array(self.grid.shape) - margin)
+
+def overlaps(points: np.ndarray, occupied: np.ndarray):
+    # One-off check: which of the points (..., 2) land on a site of the occupied (M, 2) beads
+    if len(occupied) == 0:
+        return np.zeros(points.shape[:-1], dtype=bool)
+
+    # Pad the grid far enough to cover every point
+    flat = points.reshape(-1, 2)
+    padding = int(max(np.abs(flat - occupied.min(axis=0)).max(), np.abs(flat - occupied.max(axis=0)).max()))
+
+    return Occupancy(occupied, padding=padding).is_occupied(points)
+
+
+# Relative turns between consecutive bonds
+RIGHT, STRAIGHT, LEFT = 0, 1, 2
+
+def coords_to_turns(coords_batch: np.ndarray):
+    # (P, N, 2) conformations -> (P, N - 2) relative turns. Turns don't change under rotation or translation.
+    steps = np.diff(coords_batch.astype(np.int64), axis=1)
+    cross = steps[:, :-1, 0] * steps[:, 1:, 1] - steps[:, :-1, 1] * steps[:, 1:, 0] # +1 left, 0 straight, -1 right
+
+    return (cross + STRAIGHT).astype(np.uint8)
+
+def canonical_form(coords_batch: np.ndarray, reversible: bool = False):
+    # (P, N, 2) conformations -> (P, N - 2) canonical turn strings: the lexicographically smallest turn string
+    # over all 8 lattice symmetries (rotations are already gone in turn space, reflections swap left/right).
+    # With reversible=True (palindromic sequences) a fold read backwards counts as the same fold too.
+    turns = coords_to_turns(coords_batch)
+    mirrored = (LEFT - turns).astype(np.uint8)
+
+    canonical = lexicographic_min(turns, mirrored)
+    if reversible:
+        # Reading a fold backwards reverses the turn order AND swaps left/right
+        canonical = lexicographic_min(canonical, mirrored[:, ::-1])
+        canonical = lexicographic_min(canonical, turns[:, ::-1])
+
+    return np.ascontiguousarray(canonical)
+
+def lexicographic_min(a: np.ndarray, b: np.ndarray):
+    # Row-wise lexicographic minimum of two (P, L) arrays
+    differs = a != b
+    first_diff = np.argmax(differs, axis=1)
+    rows = np.arange(a.shape[0])
+
+    a_smaller = ~np.any(differs, axis=1) | (a[rows, first_diff] < b[rows, first_diff])
+
+    return np.where(a_smaller[:, None], a, b)
+
+def shape_key(coords: np.ndarray, reversible: bool = False):
+    # Hashable key of ONE fold's shape (same for every symmetric copy), e.g. for caches or leaderboard dedup
+    return canonical_form(coords[None], reversible)[0].tobytes()
+
+
+# GENOME: a fold as N - 1 two-bit codes (first bond direction, then one relative turn per bond), 4 codes per byte
+def encode_genome(coords_batch: np.ndarray):
+    # (P, N, 2) conformations -> (P, ceil((N - 1) / 4)) packed uint8 genomes. Translation is dropped.
+    steps = np.diff(coords_batch.astype(np.int64), axis=1)[:, :1, :] # first bond of each fold
+    first_direction = np.argmax(np.all(steps == STEPS[None, :, :], axis=2), axis=1).astype(np.uint8)
+
+    codes = np.concatenate([first_direction[:, None], coords_to_turns(coords_batch)], axis=1)
+
+    return pack_codes(codes)
+
+def decode_genome(genomes: np.ndarray, length: int, origins: np.ndarray = None):
+    # (P, bytes) packed genomes -> (P, N, 2) conformations, with the first bead at origins (default 0, 0)
+    codes = unpack_codes(genomes, length - 1).astype(np.int64)
+
+    # Right turn = +1 heading, straight = 0, left = -1
+    headings = (codes[:, :1] + np.cumsum(STRAIGHT - codes[:, 1:], axis=1)) % 4
+    headings = np.concatenate([codes[:, :1], headings], axis=1)
+
+    coords = np.zeros((genomes.shape[0], length, 2), dtype=COORD_DTYPE)
+    coords[:, 1:, :] = np.cumsum(STEPS[headings], axis=1)
+    if origins is not None:
+        coords += np.asarray(origins, dtype=COORD_DTYPE).reshape(-1, 1, 2)
+
+    return coords
+
+def pack_codes(codes: np.ndarray):
+    # (P, L) array of 2-bit codes -> (P, ceil(L / 4)) bytes
+    num_codes = codes.shape[1]
+    padded = np.zeros((codes.shape[0], -(-num_codes // 4) * 4), dtype=np.uint8)
+    padded[:, :num_codes] = codes
+
+    quads = padded.reshape(codes.shape[0], -1, 4)
+
+    return (quads[..., 0] << 6) | (quads[..., 1] << 4) | (quads[..., 2] << 2) | quads[..., 3]
+
+def unpack_codes(packed: np.ndarray, num_codes: int):
+    # Inverse of pack_codes
+    shifts = np.array([6, 4, 2, 0], dtype=np.uint8)
+    codes = (packed[..., None] >> shifts) & 3
+
+    return codes.reshape(packed.shape[0], -1)[:, :num_codes]
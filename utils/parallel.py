@@ -0,0 +1,99 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Queue, shared_memory
+
+import numpy as np
+
+from population import mutate_children
+from sequence import Sequence
+from utils.initialization import MoveStats, reseed
+from utils.lattice import COORD_DTYPE
+
+# Per-worker state: the shared memory buffer this worker is attached to
+worker_buffers = {}
+
+
+class OffspringPool:
+    # Mutates and scores children in worker processes. The children's coordinates go into ONE shared memory
+    # buffer, every worker mutates its own slice of it in place and only sends back that slice's energies.
+    def __init__(self, num_workers: int = None, seed: int = None):
+        self.num_workers = num_workers or os.cpu_count()
+
+        self.executor = make_worker_pool(self.num_workers, seed)
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def buffer(self, shape: tuple):
+        # Shared coordinate buffer, only reallocated when the children no longer fit
+        num_bytes = int(np.prod(shape)) * np.dtype(COORD_DTYPE).itemsize
+
+        if self.shm is None or self.shm.size < num_bytes:
+            self.release()
+            self.shm = shared_memory.SharedMemory(create=True, size=num_bytes)
+
+        return np.ndarray(shape, dtype=COORD_DTYPE, buffer=self.shm.buf)
+
+    def mutate(self, coords_batch: np.ndarray, jackpot: np.ndarray, sequence: Sequence, move_mix: dict = None,
+               move_stats: MoveStats = None):
+        # Same as population.mutate_children, split into one contiguous chunk per worker
+        shared = self.buffer(coords_batch.shape)
+        shared[:] = coords_batch
+
+        bounds = np.linspace(0, len(coords_batch), self.num_workers + 1).astype(int)
+        futures = [self.executor.submit(mutate_chunk, self.shm.name, coords_batch.shape, start, stop,
+                                        jackpot[start:stop], sequence, move_mix)
+                   for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+        results = [future.result() for future in futures]
+        energies = np.concatenate([chunk_energies for chunk_energies, _ in results])
+        if move_stats is not None:
+            for _, chunk_stats in results:
+                move_stats.merge(chunk_stats)
+
+        coords_batch[:] = shared
+        del shared # no views may outlive the buffer
+
+        return energies
+
+    def release(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self):
+        self.executor.shutdown()
+        self.release()
+
+def make_worker_pool(num_workers: int, seed: int = None):
+    # Process pool whose workers each take one independent RNG stream (SeedSequence.spawn) when they start
+    seeds = Queue()
+    for child_seed in np.random.SeedSequence(seed).spawn(num_workers):
+        seeds.put(child_seed)
+
+    return ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker, initargs=(seeds,))
+
+def init_worker(seeds: Queue):
+    # This worker's copy of the shared NumPy generator gets its own stream
+    reseed(seeds.get())
+
+def mutate_chunk(shm_name: str, shape: tuple, start: int, stop: int, jackpot: np.ndarray, sequence: Sequence,
+                 move_mix: dict = None):
+    # Runs in a worker: attach to the shared buffer (once per buffer) and mutate children [start, stop) in place.
+    # Returns (their energies, their MoveStats)
+    if shm_name not in worker_buffers:
+        for old_shm in worker_buffers.values():
+            old_shm.close()
+        worker_buffers.clear()
+        worker_buffers[shm_name] = shared_memory.SharedMemory(name=shm_name)
+
+    shared = np.ndarray(shape, dtype=COORD_DTYPE, buffer=worker_buffers[shm_name].buf)
+    move_stats = MoveStats()
+    energies = mutate_children(shared[start:stop], jackpot, sequence, move_mix, move_stats=move_stats)
+    del shared
+
+    return energies, move_stats
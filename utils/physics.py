@@ -1,7 +1,19 @@
 import numpy as np
-import streamlit as st
-from scipy.spatial.distance import pdist
 
+from utils.lattice import Occupancy, count_key_hits, get_neighborhood, pack_keys, pack_offsets
+
+
+# Lattice neighbour offsets, shaped to probe the sites around a batch of points (..., 1, 2)
+VN_OFFSETS = get_neighborhood("vn")[None, :, :]
+
+def get_h_mask(names):
+    # A Sequence carries its H mask precomputed, a plain names array gets it computed here
+    h_mask = getattr(names, 'h_mask', None)
+    return h_mask if h_mask is not None else (names == 'H')
+
+def get_h_indices(names):
+    h_indices = getattr(names, 'h_indices', None)
+    return h_indices if h_indices is not None else np.where(names == 'H')[0]
 
 def unvectorized_calculate(locations: np.ndarray, names: np.ndarray, n_hood: str = "vn"):
     score = 0
@@ -32,20 +44,96 @@ def unvectorized_calculate(locations: np.ndarray, names: np.ndarray, n_hood: str
     return score
 
 # VECTORIZED VERSION
-def calculate_energy_vectorized(coords: np.ndarray, names: np.ndarray):
-    h_mask = (names == 'H')
+def calculate_energy_vectorized(coords: np.ndarray, names: np.ndarray, n_hood: str = "vn"):
+    # Lattice hash-grid: every H bead becomes one integer key, and we look up its neighbour keys in the sorted
+    # key table instead of measuring every pairwise distance (O(H log H) instead of O(H^2))
+    offsets = get_neighborhood(n_hood)
+    h_indices = get_h_indices(names)
+    h_coords = coords[h_indices, :]
+
+    if len(h_indices) == 0:
+        return 0
+
+    origin = h_coords.min(axis=0) - 1
+    stride = int((h_coords.max(axis=0) - origin).max()) + 2
+
+    h_keys = pack_keys(h_coords, origin, stride)
+    hits = count_key_hits(h_keys, h_indices, h_keys, h_indices, pack_offsets(offsets, stride))
+
+    score = int(hits.sum()) // 2 # Every contact is found from both sides
+
+    return score
+
+# INCREMENTAL VERSION (pivot and local moves)
+def contact_grid(coords: np.ndarray, names: np.ndarray, padding: int = 1, cover: np.ndarray = None):
+    # Occupancy grid of the H beads only (what calculate_energy_delta probes), reaching `padding` sites around the
+    # whole chain and the cover points
+    h_indices = get_h_indices(names)
+    bounds = coords if cover is None else np.concatenate([coords, cover])
+
+    return Occupancy(coords[h_indices], padding, h_indices, cover=bounds)
+
+def calculate_energy_delta(coords: np.ndarray, names: np.ndarray, moved: slice, new_moved: np.ndarray,
+                           rigid: bool = True, occupancy: Occupancy = None):
+    # coords are the PRE-move coordinates, moved is the transformed tail and new_moved is where it goes.
+    # Only the moved H beads are probed, in ONE lookup in the contact_grid of the pre-move chain: around their old
+    # sites it finds the contacts lost, around their new sites the contacts gained with the body (the moved beads
+    # are still at their old sites in the grid, so they are left out). Bonded pairs need no check: every move
+    # keeps the chain connected, so the tail's bonds to the body are found on both sides and cancel out.
+    # A rigid move keeps the tail's internal contacts. Non-rigid moves (pull moves) also recount them.
+    # A caller making many moves on one chain can keep its own contact_grid (Occupancy.move after every accepted
+    # move), as long as it reaches every new site.
+    first, stop, _ = moved.indices(coords.shape[0])
+    tail_h = get_h_mask(names)[first:stop]
+    h_offsets = np.flatnonzero(tail_h) # moved H beads, counted from the start of the tail
+    num_h = len(h_offsets)
+
+    if num_h == 0:
+        return 0
+
+    new_sites = new_moved[h_offsets]
+    if occupancy is None:
+        occupancy = contact_grid(coords, names, cover=new_sites)
+
+    sites = np.concatenate([coords[h_offsets + first], new_sites]) # old sites, then new sites
+    partners = occupancy.lookup(sites[:, None, :] + VN_OFFSETS)
+    in_tail = (partners - first).view(np.uint32) < (stop - first) # -1 (free site) wraps around to a huge value
+    with_body = (partners >= 0) & ~in_tail
+
+    delta = np.count_nonzero(with_body[num_h:]) - np.count_nonzero(with_body[:num_h])
+
+    if not rigid: # old contacts inside the tail are found from both sides, bonds included on both sides
+        delta += touching_pairs(new_sites) - np.count_nonzero(in_tail[:num_h]) // 2
+
+    return int(delta)
+
+def touching_pairs(coords: np.ndarray):
+    # Lattice neighbours within a (small) group of beads, bonded pairs included
+    distances = np.abs(coords[:, None, :].astype(np.int64) - coords[None, :, :]).sum(axis=2)
+
+    return np.count_nonzero(distances == 1) // 2
+
+# BATCHED VERSION (whole population)
+def calculate_energy_batch(coords_batch: np.ndarray, names: np.ndarray):
+    # coords_batch is a stacked (P, N, 2) array of conformations that all share the same sequence
+    num_polymers, length = coords_batch.shape[:2]
+    h_indices = get_h_indices(names)
 
-    h_coords = coords[h_mask, :] # All h coords
-    h_indices = np.where(h_mask)[0].reshape(h_coords.shape[0], 1) # All h coords indexes
+    if len(h_indices) == 0:
+        return np.zeros(num_polymers, dtype=int)
 
-    coord_dists = pdist(h_coords) # Euclidian distances, 1 means touching
-    index_dists = pdist(h_indices) # index distances, > 1 means pair is not backbone
+    # Shift every polymer to its own corner, then give each polymer its own block of keys
+    # so the whole population shares ONE sorted key table
+    h_coords = coords_batch[:, h_indices, :]
+    origin = h_coords.min(axis=1, keepdims=True) - 1
+    stride = length + 2 # a walk of N beads never spans more than N - 1 sites
 
-    is_spatial_neighbor = (coord_dists == 1) # If they are neighboring (N, S, E, W): VON NEUMANN DISTANCE!!!
-    is_not_backbone = (index_dists > 1) # Pairs that are not directly next to each other in sequence
+    block = np.arange(num_polymers, dtype=np.int64)[:, None] * stride**2
+    h_keys = (pack_keys(h_coords, origin, stride) + block).ravel()
+    all_indices = np.tile(h_indices, num_polymers)
 
-    neighbor_not_backbone = is_spatial_neighbor & is_not_backbone # If touching, but not part of backbone, TRUE
+    hits = count_key_hits(h_keys, all_indices, h_keys, all_indices, pack_offsets(get_neighborhood("vn"), stride))
 
-    score = sum(neighbor_not_backbone) # Sum number of connections (two-way) = +1 score
+    energies = hits.reshape(num_polymers, len(h_indices)).sum(axis=1) // 2
 
-    return score
\ No newline at end of file
+    return energies
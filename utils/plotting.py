@@ -1,7 +1,6 @@
 import math
 
 import numpy as np
-import plotly.graph_objects as go
 import streamlit as st
 from streamlit.delta_generator import DeltaGenerator
 
@@ -10,6 +9,8 @@ from utils.stats_helpers import get_best_poly, get_worst_poly
 
 
 def visualize_chain_plotly(coords: np.ndarray, names: np.ndarray):
+    import plotly.graph_objects as go # imported on first use (plotly is slow to import)
+
     x = coords[:, 0]
     y = coords[:, 1]
     colors = ['#E41A1C' if name == 'H' else '#377EB8' for name in names]
@@ -34,6 +35,8 @@ def visualize_chain_plotly(coords: np.ndarray, names: np.ndarray):
 
 
 def graph_energies(energy_stats: list):
+    import plotly.graph_objects as go
+
     energies = np.array(energy_stats) # Convert to numpy array for efficiency
 
     x = np.arange(energies.shape[0])
@@ -103,6 +106,8 @@ def plot_energies(container: DeltaGenerator = st):
 
 
 def graph_deaths(deaths: dict):
+    import plotly.graph_objects as go
+
     # Get all ages
     ages = list(deaths.keys())
     # Sort ages
@@ -138,6 +143,8 @@ def plot_deaths(deaths: dict, key_suffix: str, container: DeltaGenerator = st):
                            key=f"deaths_{key_suffix}")
 
 def graph_selection_differential(sd: list):
+    import plotly.graph_objects as go
+
     x = np.arange(1, len(sd) + 1)
 
     fig = go.Figure(go.Scatter(x=x, y=sd))
@@ -158,6 +165,8 @@ def plot_selection_differential(sd: list, key_suffix: str, container: DeltaGener
                            width='stretch', key=f'selection_diff{key_suffix}')
 
 def graph_pop_scores(scores: list):
+    import plotly.graph_objects as go
+
     fig = go.Figure(data=[go.Histogram(x=scores)])
 
     fig.update_yaxes(fixedrange=True)
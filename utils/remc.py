@@ -0,0 +1,149 @@
+import numpy as np
+
+from population import Population
+from sequence import Sequence
+from utils.initialization import DEFAULT_MOVE_MIX, RIGID_MOVES, MoveStats, random_move, rng
+from utils.parallel import make_worker_pool
+from utils.physics import calculate_energy_delta, contact_grid, get_h_mask
+
+class ReplicaExchange:
+    # Replica-exchange Monte Carlo (parallel tempering): one replica per temperature of a geometric ladder.
+    # Each round, every replica does steps_per_exchange Metropolis steps (moves drawn from move_mix) at its own
+    # temperature, then neighbouring temperatures try to swap replicas. Cold replicas refine good folds,
+    # hot ones cross energy barriers and hand their finds down the ladder.
+    # `population` holds the replicas in ladder order (row k is at temperatures[k]), like a GA population.
+    def __init__(self, sequence: Sequence, num_replicas: int = 8, t_min: float = 0.3, t_max: float = 1.2,
+                 steps_per_exchange: int = 100, move_mix: dict = None, num_workers: int = 1, seed: int = None):
+        if num_replicas < 2:
+            raise ValueError(f"Error: Replica exchange needs at least 2 replicas, not {num_replicas}.")
+
+        self.sequence = sequence
+        self.temperatures = np.geomspace(t_min, t_max, num_replicas)
+        self.steps_per_exchange = steps_per_exchange
+        self.move_mix = move_mix or DEFAULT_MOVE_MIX
+
+        self.population = Population.random(sequence, num_replicas)
+        self.rounds = 0
+        self.steps = 0 # Monte Carlo steps done by EACH replica
+
+        # Best fold ever seen, and the energy evaluations (steps over all replicas) it took to find it
+        best_idx = np.argmax(self.population.energies)
+        self.best_energy = int(self.population.energies[best_idx])
+        self.best_coords = self.population.coords[best_idx].copy()
+        self.best_iterations = 0
+
+        # Acceptance statistics per temperature and per move type
+        self.moves_accepted = np.zeros(num_replicas, dtype=int)
+        self.move_stats = MoveStats()
+        self.swaps_tried = np.zeros(num_replicas - 1, dtype=int)
+        self.swaps_accepted = np.zeros(num_replicas - 1, dtype=int)
+
+        # Replicas run independently between exchanges, so they can each go to a worker process
+        self.num_workers = num_workers
+        self.executor = None
+        if num_workers > 1:
+            self.executor = make_worker_pool(num_workers, seed)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def step(self):
+        # One round: Monte Carlo on every replica, then one exchange sweep. Returns the replicas as a Population.
+        num_replicas = len(self.population)
+        args = (list(self.population.coords), list(self.population.energies), list(self.temperatures),
+                [self.steps_per_exchange] * num_replicas, [self.sequence] * num_replicas,
+                [self.move_mix] * num_replicas)
+
+        results = self.executor.map(run_replica, *args) if self.executor else map(run_replica, *args)
+
+        for k, (coords, energy, best_energy, best_coords, best_step, move_stats) in enumerate(results):
+            self.population.coords[k] = coords
+            self.population.energies[k] = energy
+            self.moves_accepted[k] += sum(move_stats.accepted.values())
+            self.move_stats.merge(move_stats)
+
+            if best_energy > self.best_energy:
+                self.best_energy = best_energy
+                self.best_coords = best_coords
+                self.best_iterations = (self.steps + best_step + 1) * num_replicas
+
+        self.steps += self.steps_per_exchange
+        self.rounds += 1
+        self.exchange()
+
+        return self.population
+
+    def exchange(self):
+        # Alternate between the even (0-1, 2-3, ...) and odd (1-2, 3-4, ...) neighbour pairs.
+        # Swap k <-> k+1 with probability min(1, exp((1/T_k - 1/T_k+1) * (E_k - E_k+1))), where E = -score.
+        energies = self.population.energies
+        lower = np.arange(self.rounds % 2, len(energies) - 1, 2)
+        upper = lower + 1
+
+        betas = 1 / self.temperatures
+        exponent = (betas[lower] - betas[upper]) * (energies[upper] - energies[lower])
+        swap = np.log(rng.random(len(lower))) < exponent
+
+        order = np.arange(len(energies))
+        order[lower[swap]], order[upper[swap]] = upper[swap], lower[swap]
+        self.population.keep(order)
+
+        self.swaps_tried[lower] += 1
+        self.swaps_accepted[lower[swap]] += 1
+
+    def acceptance_rates(self):
+        # (move acceptance per temperature, swap acceptance per neighbour pair, move acceptance per move type)
+        move_rates = self.moves_accepted / max(self.steps, 1)
+        swap_rates = self.swaps_accepted / np.maximum(self.swaps_tried, 1)
+
+        return move_rates, swap_rates, self.move_stats.rates()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+def run_replica(coords: np.ndarray, energy: int, temperature: float, num_steps: int, sequence: Sequence,
+                move_mix: dict):
+    # Metropolis at one temperature: improvements are always taken, a move losing d contacts is taken with
+    # probability exp(-d / T). Scored incrementally against one contact grid kept up to date across the steps (and
+    # rebuilt only when the chain drifts out of it), so no move costs a full energy evaluation.
+    coords = coords.copy()
+    energy = int(energy)
+    best_energy, best_coords, best_step = energy, coords.copy(), -1
+    move_stats = MoveStats()
+
+    h_mask = get_h_mask(sequence)
+    indices = np.arange(coords.shape[0])
+    padding = coords.shape[0] # a pivot moves no bead further than the chain length
+    occupancy = contact_grid(coords, sequence, padding)
+
+    for step in range(num_steps):
+        move_type, move = random_move(coords, move_mix)
+        if move is None:
+            move_stats.record(move_type, valid=False, accepted=False)
+            continue
+
+        moved, new_moved = move
+        if not occupancy.reaches(new_moved, margin=1):
+            occupancy = contact_grid(coords, sequence, padding, cover=new_moved)
+
+        delta = calculate_energy_delta(coords, sequence, moved, new_moved, rigid=move_type in RIGID_MOVES,
+                                       occupancy=occupancy)
+
+        accepted = delta >= 0 or rng.random() < np.exp(delta / temperature)
+        move_stats.record(move_type, valid=True, accepted=accepted)
+
+        if accepted:
+            tail_h = h_mask[moved]
+            occupancy.move(coords[moved][tail_h], new_moved[tail_h], indices[moved][tail_h])
+            coords[moved] = new_moved
+            energy += delta
+
+            if energy > best_energy:
+                best_energy, best_coords, best_step = energy, coords.copy(), step
+
+    return coords, energy, best_energy, best_coords, best_step, move_stats
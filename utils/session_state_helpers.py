@@ -1,22 +1,7 @@
-import streamlit as st
-from streamlit.delta_generator import DeltaGenerator
-
-def update_death_log(population: list, session_state: str):
-    death_log = st.session_state.get(session_state, None)
-
-    if death_log is None:
-        raise ValueError(f"ERROR: Session state {session_state} does not exist for updating death log...")
+import threading
+import weakref
 
-    for polymer in population:
-        poly_age = polymer.age
-
-        if death_log.get(poly_age):
-            death_log[poly_age] += 1
-        else:
-            death_log[poly_age] = 1
-
-def update_selection_differential(selection_differential: float):
-    st.session_state["selection_differential"].append(selection_differential)
+from streamlit.delta_generator import DeltaGenerator
 
 def track_progress(iterable, text: str = "PLACEHOLDER", container = DeltaGenerator):
     progress_bar = container.progress(0, text=f"{text}...")
@@ -25,4 +10,34 @@ def track_progress(iterable, text: str = "PLACEHOLDER", container = DeltaGenerat
         yield item
 
         progress_bar.progress((i + 1) / total, text=text)
-    progress_bar.empty()
\ No newline at end of file
+    progress_bar.empty()
+
+class SessionResources:
+    # What a session keeps running outside its script: its engines (worker pool and shared memory, island
+    # processes, replica workers) and its bulk job, by session state key. Kept ONLY in the session state, so it is
+    # collected when Streamlit drops that state (tab closed and the disconnected session expired) and everything
+    # still registered here is closed then. Closed engines are registered as None.
+    def __init__(self):
+        self.resources = {}
+        self.finalizer = weakref.finalize(self, close_in_background, self.resources)
+        self.finalizer.atexit = False # no new threads at interpreter exit, the pools clean up after themselves then
+
+    def __setitem__(self, key: str, resource):
+        self.resources[key] = resource
+
+def close_in_background(resources: dict):
+    # The finalizer may run in any thread (e.g. a bulk job's, in a garbage collection), which must not wait for
+    # the job itself: the closing gets its own thread
+    threading.Thread(target=close_resources, args=(resources,), daemon=True).start()
+
+def close_resources(resources: dict):
+    # The bulk job first (after the chunk in progress), then the engines it may still be using
+    job = resources.pop('bulk_job', None)
+    if job is not None:
+        job.cancel()
+        job.join()
+
+    for resource in resources.values():
+        if resource is not None:
+            resource.close()
+    resources.clear()
@@ -1,24 +1,24 @@
-import statistics as stats
-
 import numpy as np
 
+from population import Population
+
 
-def get_energy_statistics(population: list):
-    energies = [p.energy for p in population]
+def get_energy_statistics(population: Population):
+    energies = population.energies
 
-    min_energy = min(energies)
+    min_energy = energies.min()
     q1_energy = np.percentile(energies, 25)
-    median_energy = stats.median(energies)
+    median_energy = np.median(energies)
     q3_energy = np.percentile(energies, 75)
-    max_energy = max(energies)
+    max_energy = energies.max()
 
     energy_stats = [min_energy, q1_energy, median_energy, q3_energy, max_energy]
     return energy_stats
 
-def get_best_poly(population: list):
-    max_parent = max(population, key=lambda polymer: polymer.energy)
+def get_best_poly(population: Population):
+    max_parent = population.polymer(np.argmax(population.energies))
     return max_parent
 
-def get_worst_poly(population: list):
-    min_parent = min(population, key=lambda polymer: polymer.energy)
+def get_worst_poly(population: Population):
+    min_parent = population.polymer(np.argmin(population.energies))
     return min_parent
\ No newline at end of file